@@ -1,61 +1,133 @@
+import time
+RENDER_START = time.perf_counter()  # Page render time is measured from here
 import streamlit as st
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-import pymongo
-import bcrypt
-from wordcloud import WordCloud
-import io
 from PIL import Image
-from textblob import TextBlob
 from streamlit_cookies_manager import CookieManager
+from app.cache import LRUCache
+from app.db import find_user_for_login, user_exists, users_collection
+from app.feedback import add_feedback
+from app.metrics import FACTCHECK_QUERY_SECONDS, PAGE_RENDER_SECONDS, start_http_server
+from app.ratelimit import RateLimiter, make_store
+from app.sessions import generate_secret, hash_password, hash_rounds, issue_token, verify_password, verify_token
+from app.trending import Warmer
+from claim_rules import review_results
+from factcheck_client import FACTCHECK_API_URL, FactCheckAPIError, FactCheckClient
+from visualization import calculate_average_severity, sentiment_async, word_cloud_async
 
 # --- Page Config (must be the first Streamlit command) ---
 st.set_page_config(page_title="FactCheck App", layout="wide")
 
-# Initialize Cookie Manager
-cookies = CookieManager()
+# --- Load env and secrets ---
+@st.cache_resource(show_spinner=False)
+def load_settings():
+    # Once per process, not once per rerun
+    load_dotenv()
+    settings = {name: st.secrets.get(name, os.getenv(name)) for name in ("MONGO_URI", "API_KEY", "SESSION_SECRET")}
+    if not settings["SESSION_SECRET"]:
+        settings["SESSION_SECRET"] = generate_secret()
+        print("SESSION_SECRET is not set: using a random one, sessions will not survive a restart "
+              "and are not shared between processes")
+    return settings
+
+SETTINGS = load_settings()
+MONGO_URI = SETTINGS["MONGO_URI"]
+API_KEY = SETTINGS["API_KEY"]
+SESSION_SECRET = SETTINGS["SESSION_SECRET"]  # Signs session cookies
+SESSION_TTL = int(os.getenv("SESSION_TTL", 7 * 24 * 3600))  # Seconds a login lasts
+SESSION_COOKIE = "clarifai_session"
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))  # Stored hashes with another cost are upgraded at login
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", 4))  # Threads running bcrypt for every session of this process
+
+# One pooled client per process (app/db.py), reused by every rerun and session
+
+# --- Cookies ---
+# Cookies are read from the page request (st.context.cookies), so a returning
+# user is signed in on the first run instead of after the CookieManager
+# component has loaded; Streamlit versions without st.context fall back to it.
+# The component is only needed to write cookies, and is only rendered when
+# they may be written (signed out, or writes still pending).
+REQUEST_COOKIES = getattr(getattr(st, "context", None), "cookies", None)
+_cookie_manager = None
+
+def cookie_manager(wait=True):
+    # One CookieManager per run. With `wait`, stops the run until the component
+    # is ready; Streamlit reruns the script when it is
+    global _cookie_manager
+    if _cookie_manager is None:
+        _cookie_manager = CookieManager()
+    if wait and not _cookie_manager.ready():
+        st.stop()
+    return _cookie_manager
+
+def request_cookie(name):
+    if REQUEST_COOKIES is not None:
+        return REQUEST_COOKIES.get(name)
+    return cookie_manager().get(name)
 
-# --- IMPORTANT: Wait for cookies to be ready before proceeding with authentication logic ---
-if not cookies.ready():
-    st.warning("Loading cookies...")
-    st.stop() # Stops the script execution until the cookies are ready
-              # Streamlit will automatically rerun once the component is ready.
-
-# --- Initialize session state from cookie ---
-# Do this ONCE, at the very top of the script.
+# --- Auth helpers ---
+@st.cache_resource
+def get_auth_executor():
+    # Once per process. bcrypt runs here rather than on the script thread: the
+    # login run only waits for the one check it needs, and a hash upgrade
+    # finishes in the background
+    return ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+
+def upgrade_password_hash(email, password):
+    def run():
+        try:
+            users_collection(MONGO_URI).update_one(
+                {"email": email}, {"$set": {"password": hash_password(password, BCRYPT_ROUNDS)}})
+        except Exception as e:
+            print(f"Could not upgrade the password hash of {email}: {e}")
+    get_auth_executor().submit(run)
+
+def sign_in(email, username):
+    st.session_state.authenticated = True
+    st.session_state.user = email
+    st.session_state.username = username
+    st.session_state.page = "FactCheck"
+    st.session_state.session_expires = time.time() + SESSION_TTL
+
+    # Only the signed token is stored in the browser
+    cookies = cookie_manager()
+    cookies[SESSION_COOKIE] = issue_token(email, username, SESSION_SECRET, SESSION_TTL)
+    cookies.save()
+
+def sign_out():
+    st.session_state.authenticated = False
+    st.session_state.page = "Login"
+    st.session_state.username = ''
+    st.session_state.user = ''
+    st.session_state.session_expires = 0
+
+# --- Initialize session state from the session cookie ---
+# Once per session: the token is checked with its signature, no database lookup
 if 'authenticated' not in st.session_state:
-    # Now, cookies are guaranteed to be ready here
-    if cookies.get('username'):
-        # If cookie exists, set session state from cookie
+    session = verify_token(request_cookie(SESSION_COOKIE), SESSION_SECRET)
+    sign_out()
+    if session:
         st.session_state['authenticated'] = True
-        st.session_state['username'] = cookies.get('username')
-        st.session_state['user'] = cookies.get('user_email')
+        st.session_state['username'] = session['username']
+        st.session_state['user'] = session['email']
         st.session_state['page'] = 'FactCheck'
-    else:
-        # If no cookie, initialize session state as new
-        st.session_state['authenticated'] = False
-        st.session_state['page'] = 'Login'
-        st.session_state['username'] = ''
-        st.session_state['user'] = ''
-
-# ... (the rest of your app.py code remains the same from the previous correction) ...
-
-# --- Load env and MongoDB connection ---
-load_dotenv()
-MONGO_URI = st.secrets.get("MONGO_URI", os.getenv("MONGO_URI"))
-API_KEY = st.secrets.get("API_KEY", os.getenv("API_KEY"))
-
-client = pymongo.MongoClient(MONGO_URI)
-db = client.get_database("factcheck_db")
-users_collection = db.get_collection("user_data")
-
-# --- Auth helpers ---
-def hash_password(password):
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
-
-def verify_password(stored_password, password):
-    return bcrypt.checkpw(password.encode('utf-8'), stored_password)
+        st.session_state['session_expires'] = session['exp']
+elif st.session_state.authenticated and st.session_state.get('session_expires', 0) <= time.time():
+    sign_out()
+
+if st.session_state.get('logging_out'):
+    # The component is not rendered while signed in, so this waits for it once
+    cookies = cookie_manager()
+    for name in (SESSION_COOKIE, 'username', 'user_email'):  # Including the pre-token cookies
+        if name in cookies:
+            del cookies[name]
+    cookies.save()
+    st.session_state.logging_out = False
+elif not st.session_state.authenticated or st.session_state.get('CookieManager.queue'):
+    # Loaded in the background, so it is ready by the time the login form is submitted
+    cookie_manager(wait=False)
 
 def login():
     st.title("Login")
@@ -66,17 +138,14 @@ def login():
 
         if submitted:
             if email and password:
-                user = users_collection.find_one({"email": email})
-                if user and verify_password(user["password"], password):
-                    st.session_state.authenticated = True
-                    st.session_state.user = email
-                    st.session_state.username = user.get('username', email)
-                    st.session_state.page = "FactCheck"
-
-                    # Set cookies
-                    cookies['username'] = st.session_state.username
-                    cookies['user_email'] = st.session_state.user
-                    cookies.save()
+                user = find_user_for_login(email, MONGO_URI)
+                valid = user is not None and \
+                    get_auth_executor().submit(verify_password, user["password"], password).result()
+                if valid:
+                    if hash_rounds(user["password"]) != BCRYPT_ROUNDS:
+                        # Re-hashed with the configured cost while the password is at hand
+                        upgrade_password_hash(email, password)
+                    sign_in(email, user.get('username', email))
 
                     st.success("Successfully logged in!")
                     st.rerun()
@@ -95,24 +164,17 @@ def signup():
 
         if submitted:
             if username and email and password:
-                if users_collection.find_one({"email": email}):
+                # Hashed on the auth threads while the email is looked up
+                password_hash = get_auth_executor().submit(hash_password, password, BCRYPT_ROUNDS)
+                if user_exists(email, MONGO_URI):
                     st.error("Email is already in use")
                 else:
-                    users_collection.insert_one({
+                    users_collection(MONGO_URI).insert_one({
                         "username": username,
                         "email": email,
-                        "password": hash_password(password),
-                        "feedback": []
+                        "password": password_hash.result()
                     })
-                    st.session_state.authenticated = True
-                    st.session_state.user = email
-                    st.session_state.username = username
-                    st.session_state.page = "FactCheck"
-
-                    # Set cookies
-                    cookies['username'] = st.session_state.username
-                    cookies['user_email'] = st.session_state.user
-                    cookies.save()
+                    sign_in(email, username)
 
                     st.success("Account created! Logging in...")
                     st.rerun()
@@ -120,83 +182,67 @@ def signup():
                 st.error("Please fill in all fields.")
 
 # --- FactCheck API Setup ---
-URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
-
-# --- Verdict classification ---
-def classify_verdict(verdict_text):
-    verdict_text = verdict_text.lower()
-    if any(x in verdict_text for x in ["false", "misleading", "incorrect", "untrue", "fake", "inaccurate", "not true"]):
-        return "❌ False"
-    elif any(x in verdict_text for x in ["true", "accurate", "correct", "mostly true"]):
-        return "✅ True"
-    else:
-        return "⚠️ Unclear"
-
-# --- Severity logic ---
-def assign_severity(claim):
-    claim = claim.lower()
-    keywords = {
-        10: ["vaccine", "covid-19", "health", "medical"],
-        9: ["explosion", "hazard", "attack", "war"],
-        8: ["climate change", "pollution", "disaster"],
-        7: ["election", "fraud", "corruption", "government"],
-        6: ["technology", "robot", "science", "AI", "radar"],
-        5: ["celebrity", "sports", "entertainment"],
-    }
-    for score, words in keywords.items():
-        if any(word in claim for word in words):
-            return score
-    return 4 # Fallback score
+URL = os.getenv("FACTCHECK_API_URL", FACTCHECK_API_URL)
+FACTCHECK_CACHE_TTL = int(os.getenv("FACTCHECK_CACHE_TTL", 3600))
+FACTCHECK_CACHE_SIZE = int(os.getenv("FACTCHECK_CACHE_SIZE", 2048))  # Queries whose results are kept
+FACTCHECK_MAX_PAGES = int(os.getenv("FACTCHECK_MAX_PAGES", 1))  # Pages of 10 claims per query
+# Every FACTCHECK_WARMER_INTERVAL seconds (0 = never), the FACTCHECK_WARMER_TOP_N most searched
+# queries of the last FACTCHECK_TRENDING_WINDOW seconds are re-fetched if their cached result
+# expires within FACTCHECK_REFRESH_AHEAD seconds
+FACTCHECK_WARMER_INTERVAL = float(os.getenv("FACTCHECK_WARMER_INTERVAL", 60))
+FACTCHECK_WARMER_TOP_N = int(os.getenv("FACTCHECK_WARMER_TOP_N", 50))
+FACTCHECK_REFRESH_AHEAD = float(os.getenv("FACTCHECK_REFRESH_AHEAD", 300))
+FACTCHECK_TRENDING_WINDOW = float(os.getenv("FACTCHECK_TRENDING_WINDOW", 1800))
+# Searches that reach the API (cache misses) are limited per logged-in user and overall, in
+# searches per second (0 = no limit); at most FACTCHECK_MAX_INFLIGHT run at once (0 = no limit).
+# FACTCHECK_RATE_LIMIT_STORE is "memory" or a redis:// URL shared by every Streamlit process.
+FACTCHECK_USER_RATE = float(os.getenv("FACTCHECK_USER_RATE", 0.2))
+FACTCHECK_USER_BURST = int(os.getenv("FACTCHECK_USER_BURST", 10))
+FACTCHECK_GLOBAL_RATE = float(os.getenv("FACTCHECK_GLOBAL_RATE", 0))
+FACTCHECK_GLOBAL_BURST = int(os.getenv("FACTCHECK_GLOBAL_BURST", 50))
+FACTCHECK_MAX_INFLIGHT = int(os.getenv("FACTCHECK_MAX_INFLIGHT", 32))
+FACTCHECK_RATE_LIMIT_STORE = os.getenv("FACTCHECK_RATE_LIMIT_STORE", "memory")
+
+@st.cache_resource
+def get_factcheck_client():
+    # One client (connection pool + result cache) shared by every session and rerun
+    limiter = RateLimiter(make_store(FACTCHECK_RATE_LIMIT_STORE), FACTCHECK_USER_RATE, FACTCHECK_USER_BURST,
+                          FACTCHECK_GLOBAL_RATE, FACTCHECK_GLOBAL_BURST, prefix="factcheck")
+    return FactCheckClient(API_KEY, base_url=URL, cache=LRUCache(FACTCHECK_CACHE_SIZE, ttl=FACTCHECK_CACHE_TTL),
+                           max_pages=FACTCHECK_MAX_PAGES, trending_window=FACTCHECK_TRENDING_WINDOW,
+                           limiter=limiter, max_inflight=FACTCHECK_MAX_INFLIGHT)
+
+@st.cache_resource
+def start_factcheck_warmer():
+    # One background thread per process, refreshing trending queries ahead of their TTL
+    client = get_factcheck_client()
+    warmer = Warmer(lambda: client.refresh_trending(FACTCHECK_WARMER_TOP_N, FACTCHECK_REFRESH_AHEAD),
+                    FACTCHECK_WARMER_INTERVAL, name="factcheck-warmer")
+    warmer.start()
+    return warmer
+
+start_factcheck_warmer()
+
+# --- Metrics ---
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # 0 = no metrics endpoint
+
+@st.cache_resource
+def start_metrics_server():
+    # Once per process, not once per rerun
+    return start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+start_metrics_server()
 
 # --- Core logic ---
+@FACTCHECK_QUERY_SECONDS.timed
 def check_fake_news(query):
-    response = requests.get(URL, params={"query": query, "key": API_KEY})
-    if response.status_code != 200:
-        st.error(f"❌ API Error {response.status_code}: {response.text}")
-        return []
-
-    data = response.json()
-    if "claims" not in data or not data["claims"]:
+    try:
+        claims = get_factcheck_client().search(query, user=st.session_state.get('user') or None)
+    except FactCheckAPIError as e:
+        st.error(f"❌ {e}")
         return []
 
-    results = []
-    for claim in data["claims"]:
-        if "claimReview" in claim:
-            for review in claim["claimReview"]:
-                results.append({
-                    "claim": claim.get('text', 'N/A'),
-                    "fact_checker": review.get('publisher', {}).get('name', 'N/A'),
-                    "verdict": review.get('textualRating', 'N/A'),
-                    "verdict_label": classify_verdict(review.get('textualRating', '')),
-                    "url": review.get('url', '#'),
-                    "severity_score": assign_severity(claim.get('text', ''))
-                })
-    return results
-
-# --- Visualization tools ---
-def generate_word_cloud(claims):
-    text = " ".join([f"{c['claim']} {c['verdict']}" for c in claims])
-    if not text.strip():
-        return None
-    wordcloud = WordCloud(width=800, height=400, background_color="white").generate(text)
-    img = io.BytesIO()
-    wordcloud.to_image().save(img, format='PNG')
-    img.seek(0)
-    return img
-
-def analyze_sentiment(text):
-    score = TextBlob(text).sentiment.polarity
-    if score > 0.1:
-        return {"positive": 80, "neutral": 10, "negative": 10}
-    elif score < -0.1:
-        return {"positive": 10, "neutral": 20, "negative": 70}
-    else:
-        return {"positive": 20, "neutral": 60, "negative": 20}
-
-def calculate_average_severity(results):
-    if not results:
-        return 0
-    return sum(r['severity_score'] for r in results) / len(results)
+    return review_results(claims)
 
 # --- UI Logic ---
 def factcheck_input():
@@ -213,6 +259,10 @@ def factcheck_input():
                 st.error("No fact-check results found for this claim.")
                 return
 
+            # Rendered on the visuals thread pool while the results are drawn
+            sentiment_future = sentiment_async(text_input)
+            wordcloud_future = word_cloud_async(results)
+
             st.subheader("Prediction Results")
             for r in sorted(results, key=lambda x: x['severity_score'], reverse=True):
                 with st.container(border=True):
@@ -258,14 +308,17 @@ def factcheck_input():
             st.subheader("Sentiment & Word Cloud")
             col3, col4 = st.columns([1, 2])
             with col3:
-                sentiment = analyze_sentiment(text_input)
+                sentiment = sentiment_future.result()
                 st.markdown("**Sentiment Distribution**")
                 st.text(f"Positive: {sentiment['positive']}%\nNeutral:  {sentiment['neutral']}%\nNegative: {sentiment['negative']}%")
             with col4:
                 st.markdown("**Key Terms**")
-                wordcloud_img = generate_word_cloud(results)
-                if wordcloud_img:
-                    st.image(wordcloud_img, use_container_width=True)
+                wordcloud = wordcloud_future.result()
+                if wordcloud and wordcloud[0] == "image":
+                    st.image(wordcloud[1], use_container_width=True)
+                elif wordcloud:
+                    # Under load: the most frequent terms instead of the rendered cloud
+                    st.markdown("  ·  ".join(f"{term} ({count})" for term, count in wordcloud[1]))
 
         elif submitted:
             st.error("Please enter a valid input.")
@@ -281,14 +334,7 @@ def feedback_section():
 
         if submitted:
             if 'user' in st.session_state and st.session_state['user']:
-                users_collection.update_one(
-                    {"email": st.session_state['user']},
-                    {"$push": {"feedback": {
-                        "accuracy": accuracy,
-                        "experience": experience,
-                        "comments": comments
-                    }}}
-                )
+                add_feedback(st.session_state['user'], accuracy, experience, comments, MONGO_URI)
                 st.success("Thank you for your feedback! ✅")
             else:
                 st.error("You must be logged in to submit feedback.")
@@ -307,16 +353,9 @@ def main():
             st.rerun()
         st.sidebar.markdown("---")
         if st.sidebar.button("Logout", use_container_width=True):
-            # Delete cookies
-            del cookies['username']
-            del cookies['user_email']
-            cookies.save()
-            
-            # Clear session state
-            st.session_state.authenticated = False
-            st.session_state.page = "Login"
-            st.session_state.username = ''
-            st.session_state.user = ''
+            # Clear session state; the cookie is deleted at the top of the next run
+            sign_out()
+            st.session_state.logging_out = True
             st.rerun()
 
     else: # Not authenticated
@@ -338,4 +377,7 @@ def main():
         feedback_section()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    finally:
+        PAGE_RENDER_SECONDS.observe(time.perf_counter() - RENDER_START)
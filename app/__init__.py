@@ -1,18 +1,20 @@
-from flask import Flask
-from flask_pymongo import PyMongo
-
-# Initialize PyMongo instance
-mongo = PyMongo()
+# Flask is imported in create_app, so modules such as app.metrics can be
+# imported by processes that do not run the API (e.g. the Streamlit UI).
+# Mongo is reached through app.db, which keeps one pooled client per process.
 
 def create_app():
+    from flask import Flask
+
     app = Flask(__name__)
     app.config.from_object('app.config.Config')
-    
-    # Initialize the app with MongoDB
-    mongo.init_app(app)
 
-    # Import and initialize routes
-    from app.routes import init_routes
-    init_routes(app)
+    # Load the model now instead of on the first request (see Config.MODEL_PRELOAD)
+    if app.config.get("MODEL_PRELOAD"):
+        from app.model_registry import preload
+        preload()
+
+    # Register routes
+    from app.routes import api
+    app.register_blueprint(api)
 
     return app
@@ -0,0 +1,231 @@
+# asgi.py - asyncio serving mode for the fact-check API
+#
+#   uvicorn app.asgi:app --host 0.0.0.0 --port 8000
+#
+# Same endpoints and JSON contract as the Flask `api` blueprint. Mongo is
+# reached through PyMongo's native asyncio client, and requests wait for the
+# batching engine without holding a thread, so a connection that is waiting
+# costs a coroutine instead of an OS thread.
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime
+import json
+import time
+
+from pymongo import AsyncMongoClient, errors
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.config import Config
+from app.metrics import (CONTENT_TYPE, INFERENCE_WAIT_SECONDS, MONGO_INSERT_SECONDS, MONGO_LOOKUP_SECONDS, merge_timings,
+                         render, server_timing_header, start_timings)
+from app.db import CONTENT_COLLATION, FACT_CHECK_DB, FACT_CHECK_PROJECTION, FACT_CHECKS
+from app.models import cached_view, content_key, find_similar_fact_check, new_fact_check, verdict_cache
+from app.ratelimit import RequestRejected
+from app.routes import (NDJSON_MIMETYPES, batch_cost, chunk_results, client_id, collect_misses, fact_check_flight,
+                        for_caller, is_valid_content, iter_chunks, iter_ndjson_contents, load_shedder, model_response,
+                        rate_limiter, record_request, similar_response, stored_response, submit_prediction,
+                        verdict_label)
+
+# Indexes are created by app.models (through app.db) when it is imported above
+client = AsyncMongoClient(
+    Config.MONGO_URI,
+    maxPoolSize=Config.ASYNC_MONGO_POOL_SIZE,
+    maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+    serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+    socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+)
+collection = client[FACT_CHECK_DB][FACT_CHECKS]
+
+# Bounds how many requests are queued on the model at once; the rest wait here
+inference_slots = asyncio.Semaphore(Config.ASYNC_MAX_INFLIGHT_INFERENCE)
+
+
+# --- Async data access (same cache and collation as app/models.py) ---
+async def get_fact_check(content):
+    key = content_key(content)
+    doc = verdict_cache.get(key)
+    if doc is None:
+        with MONGO_LOOKUP_SECONDS.time():
+            doc = await collection.find_one({"content": content}, FACT_CHECK_PROJECTION, collation=CONTENT_COLLATION)
+        if doc:
+            verdict_cache.set(key, doc)
+    return doc
+
+async def get_fact_checks(contents):
+    found = {}
+    missing = []
+    for content in contents:
+        key = content_key(content)
+        doc = verdict_cache.get(key)
+        if doc is None:
+            missing.append(content)
+        else:
+            found[key] = doc
+    if missing:
+        with MONGO_LOOKUP_SECONDS.time():
+            docs = await collection.find({"content": {"$in": missing}}, FACT_CHECK_PROJECTION,
+                                         collation=CONTENT_COLLATION).to_list()
+        for doc in docs:
+            key = content_key(doc["content"])
+            verdict_cache.set(key, doc)
+            found[key] = doc
+    return found
+
+async def save_fact_check(content, verdict, prediction=None):
+    doc = new_fact_check(content, verdict, datetime.utcnow(), prediction)
+    try:
+        with MONGO_INSERT_SECONDS.time():
+            await collection.insert_one(doc)
+        verdict_cache.set(content_key(content), cached_view(doc))
+    except errors.DuplicateKeyError:
+        print(f"Duplicate content, not inserted: {content}")
+    except Exception as e:
+        print(f"Error inserting into MongoDB: {e}")
+
+async def save_fact_checks(verdicts):
+    if not verdicts:
+        return
+    now = datetime.utcnow()
+    docs = [new_fact_check(content, verdict, now, *prediction) for content, verdict, *prediction in verdicts]
+    failed = set()
+    try:
+        with MONGO_INSERT_SECONDS.time():
+            await collection.insert_many(docs, ordered=False)
+    except errors.BulkWriteError as e:
+        failed = {err["index"] for err in e.details.get("writeErrors", [])}
+    except Exception as e:
+        print(f"Error inserting into MongoDB: {e}")
+        return
+    for i, doc in enumerate(docs):
+        if i not in failed:
+            verdict_cache.set(content_key(doc["content"]), cached_view(doc))
+
+
+# --- Inference ---
+async def predict(content):
+    async with inference_slots:
+        start = time.perf_counter()
+        future = submit_prediction(content)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            INFERENCE_WAIT_SECONDS.observe(time.perf_counter() - start)
+            merge_timings(getattr(future, "timings", None))
+
+
+# --- Endpoints ---
+async def read_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+def request_client_id(request):
+    return client_id(request.headers, request.client.host if request.client else None)
+
+async def check_rate_limit(request, cost=1):
+    # A Redis-backed limiter makes a blocking round trip: run it off the event loop
+    if rate_limiter.store.blocking:
+        await run_in_threadpool(rate_limiter.check, request_client_id(request), cost)
+    else:
+        rate_limiter.check(request_client_id(request), cost)
+
+async def request_rejected(request, e):
+    return JSONResponse(e.body(), status_code=e.status, headers={"Retry-After": e.retry_after_header()})
+
+def with_server_timing(response, timings, start):
+    if Config.SERVER_TIMING:
+        timings["total"] = time.perf_counter() - start
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+async def resolve_fact_check(content):
+    existing_result = await get_fact_check(content)
+    if existing_result:
+        return stored_response(existing_result)
+
+    similar_result = find_similar_fact_check(content)
+    if similar_result:
+        return similar_response(content, similar_result)
+
+    load_shedder.check()  # Only requests that need the model are shed
+    prediction = await predict(content)
+    await save_fact_check(content, verdict_label(prediction), prediction)
+    return model_response(content, prediction)
+
+async def check_misinformation(request):
+    start = time.perf_counter()
+    timings = start_timings()
+    data = await read_json(request)
+    content = data.get("content") if isinstance(data, dict) else None
+
+    if not content:
+        return JSONResponse({"error": "Content is required"}, status_code=400)
+
+    await check_rate_limit(request)
+    key = content_key(content)
+    record_request(key, content)
+    result = await fact_check_flight.do_async(key, lambda: resolve_fact_check(content))
+    return with_server_timing(JSONResponse(for_caller(result, content)), timings, start)
+
+async def cache_stats(request):
+    return JSONResponse(verdict_cache.stats())
+
+async def metrics(request):
+    return Response(render(), headers={"Content-Type": CONTENT_TYPE})
+
+async def fact_check_chunk(contents):
+    valid = [c for c in contents if is_valid_content(c)]
+    for content in valid:
+        record_request(content_key(content), content)
+    stored = await get_fact_checks(valid)
+    similar, misses = collect_misses(valid, stored)
+    predictions = await asyncio.gather(*(predict(content) for content in misses.values()))
+    predicted = dict(zip(misses, predictions))
+    await save_fact_checks([(misses[key], verdict_label(p), p) for key, p in predicted.items()])
+    return chunk_results(contents, stored, similar, predicted)
+
+async def check_misinformation_batch(request):
+    if request.headers.get("content-type", "").split(";")[0].strip() in NDJSON_MIMETYPES:
+        # Read before the response starts: StreamingResponse listens on the same
+        # ASGI receive channel for client disconnects
+        contents = iter_ndjson_contents((await request.body()).splitlines())
+    else:
+        data = await read_json(request)
+        items = data.get("contents") if isinstance(data, dict) else data
+        if not isinstance(items, list):
+            return JSONResponse({"error": "Expected a list of contents or an NDJSON stream"}, status_code=400)
+        contents = items
+    # Admitted before the response starts: a streamed response cannot change its status later
+    await check_rate_limit(request, batch_cost(contents))
+    load_shedder.check()
+
+    async def generate():
+        index = 0
+        for chunk in iter_chunks(contents, Config.BATCH_CHUNK_SIZE):
+            for result in await fact_check_chunk(chunk):
+                yield json.dumps({"index": index, **result}) + "\n"
+                index += 1
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await client.close()
+
+app = Starlette(
+    routes=[
+        Route("/api/fact-check", check_misinformation, methods=["POST"]),
+        Route("/api/fact-check/batch", check_misinformation_batch, methods=["POST"]),
+        Route("/api/cache/stats", cache_stats, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    exception_handlers={RequestRejected: request_rejected},
+    lifespan=lifespan,
+)
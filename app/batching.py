@@ -0,0 +1,87 @@
+# batching.py - Micro-batching inference engine for the fact-check API
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from app.metrics import BATCH_SIZE, INFERENCE_WAIT_SECONDS, merge_timings, start_timings
+
+
+class BatchInferenceEngine:
+    """
+    Sits between the API and the model. Requests arriving from different
+    threads are queued, grouped into one batch (up to `max_batch_size` texts,
+    or whatever arrived within `max_wait_ms` of the first one) and passed to
+    `predict_batch` in a single call. Each caller gets its own result back.
+    With `dispatchers` > 1, that many batches can be in flight at once (e.g.
+    one per process of a worker pool).
+    """
+
+    def __init__(self, predict_batch, max_batch_size=16, max_wait_ms=10, dispatchers=1):
+        self.predict_batch = predict_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.dispatchers = max(1, int(dispatchers))
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def start(self):
+        # Started on first use so importing the module does not spawn threads
+        with self._lock:
+            self._workers = [w for w in self._workers if w.is_alive()]
+            while len(self._workers) < self.dispatchers:
+                worker = threading.Thread(target=self._run, name="batch-inference", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def submit(self, text):
+        """Queue one text and return a Future resolving to its prediction."""
+        self.start()
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def predict(self, text, timeout=None):
+        start = time.perf_counter()
+        future = self.submit(text)
+        try:
+            return future.result(timeout=timeout)
+        finally:
+            INFERENCE_WAIT_SECONDS.observe(time.perf_counter() - start)
+            merge_timings(getattr(future, "timings", None))
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]  # Block until there is work
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+            BATCH_SIZE.observe(len(texts))
+            # Tokenization and forward-pass times of this batch, handed to every
+            # caller in it for their request's timing breakdown
+            timings = start_timings()
+            for _, future in batch:
+                future.timings = timings
+            try:
+                results = self.predict_batch(texts)
+            except Exception as e:  # Fail every caller in the batch, keep the worker alive
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
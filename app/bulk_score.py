@@ -0,0 +1,268 @@
+# bulk_score.py - Offline scoring of large post dumps with BERT_Arch
+#
+# Streams a CSV, JSONL or Parquet file in chunks, scores each chunk across the
+# inference worker pool and appends verdicts and probabilities to an output
+# file (.jsonl or .csv) and/or the fact_checks collection. Progress is
+# checkpointed after every chunk, so an interrupted run picks up where it
+# stopped when started again with the same arguments.
+#
+# Run from the repository root:
+#   python -m app.bulk_score datasets/posts.csv --output datasets/posts_scored.jsonl --workers 4
+#   python -m app.bulk_score datasets/posts.parquet --column text --to-mongo
+import argparse
+import csv
+import json
+import os
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from bson import Binary
+
+from app.config import Config
+from app.db import encode_embedding, insert_fact_checks
+from app.inference import predict_fake_news_outputs, probability_fake, verdict_label
+from app.similarity import SimilarClaimIndex
+
+# Same parameters as app.models.similar_index, so the signatures it loads match
+signatures = SimilarClaimIndex() if Config.SIMILARITY_ENABLED else None
+
+
+# --- Input readers: each yields lists of at most `chunk_size` rows (dicts) ---
+def iter_csv_chunks(path, chunk_size, skip=0):
+    with open(path, newline="", encoding="utf-8") as f:
+        yield from _chunked(csv.DictReader(f), chunk_size, skip)
+
+
+def iter_jsonl_chunks(path, chunk_size, skip=0):
+    with open(path, encoding="utf-8") as f:
+        yield from _chunked((json.loads(line) for line in f if line.strip()), chunk_size, skip)
+
+
+def iter_parquet_chunks(path, chunk_size, skip=0):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Reading Parquet needs pyarrow: pip install pyarrow")
+    batches = pq.ParquetFile(path).iter_batches(batch_size=chunk_size)
+    yield from _chunked((row for batch in batches for row in batch.to_pylist()), chunk_size, skip)
+
+
+def _chunked(rows, chunk_size, skip):
+    chunk = []
+    for i, row in enumerate(rows):
+        if i < skip:
+            continue  # Already scored in a previous run
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+READERS = {".csv": iter_csv_chunks, ".jsonl": iter_jsonl_chunks, ".json": iter_jsonl_chunks,
+           ".parquet": iter_parquet_chunks}
+
+
+def reader_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in READERS:
+        raise SystemExit(f"Unsupported input format {ext!r}; expected one of {', '.join(READERS)}")
+    return READERS[ext]
+
+
+# --- Output ---
+OUTPUT_FIELDS = ["row", "id", "content", "verdict", "probability_fake"]
+
+
+class OutputFile:
+    """
+    Appends scored rows as JSONL or CSV. On resume the file is first cut back
+    to the size recorded in the checkpoint, dropping rows written after it.
+    """
+
+    def __init__(self, path, resume_at=0):
+        self.path = path
+        self.is_csv = path.lower().endswith(".csv")
+        exists = os.path.exists(path)
+        self.f = open(path, "r+" if exists else "w", newline="", encoding="utf-8")
+        self.f.truncate(resume_at)
+        self.f.seek(resume_at)
+        if self.is_csv:
+            self.writer = csv.DictWriter(self.f, fieldnames=OUTPUT_FIELDS, extrasaction="ignore")
+            if resume_at == 0:
+                self.writer.writeheader()
+
+    def write(self, results):
+        for result in results:
+            if self.is_csv:
+                self.writer.writerow(result)
+            else:
+                self.f.write(json.dumps({k: result[k] for k in OUTPUT_FIELDS}, ensure_ascii=False) + "\n")
+        self.f.flush()
+        os.fsync(self.f.fileno())  # On disk before the checkpoint says so
+        return self.f.tell()
+
+    def close(self):
+        self.f.close()
+
+
+# --- Checkpoints ---
+def load_checkpoint(path, input_path):
+    if not path or not os.path.exists(path):
+        return {"input": input_path, "rows_done": 0, "output_bytes": 0}
+    with open(path, encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    if checkpoint.get("input") != input_path:
+        raise SystemExit(f"Checkpoint {path} belongs to {checkpoint.get('input')}, not {input_path}")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    # Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# --- Scoring ---
+def make_predictor(workers, threads_per_worker, batch_size, embeddings=False):
+    """
+    Returns (predict, close). predict(texts) gives one inference.Prediction
+    per text, splitting the texts into batches of `batch_size` so every
+    worker process is kept busy.
+    """
+    if workers <= 0:
+        def predict(texts):
+            preds = []
+            for start in range(0, len(texts), batch_size):
+                preds.extend(predict_fake_news_outputs(texts[start:start + batch_size], embeddings=embeddings))
+            return preds
+        return predict, lambda: None
+
+    from app.worker_pool import InferenceWorkerPool
+    pool = InferenceWorkerPool(workers, threads_per_worker)
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def predict(texts):
+        batches = [texts[start:start + batch_size] for start in range(0, len(texts), batch_size)]
+        preds = []
+        for batch_preds in executor.map(
+                lambda batch: pool.predict_batch(batch, output="predictions", embeddings=embeddings), batches):
+            preds.extend(batch_preds)
+        return preds
+
+    def close():
+        executor.shutdown()
+        pool.close()
+
+    return predict, close
+
+
+def score_chunk(rows, first_row, column, id_column, predict):
+    texts = [row.get(column) for row in rows]
+    valid = [i for i, text in enumerate(texts) if isinstance(text, str) and text.strip()]
+    preds = dict(zip(valid, predict([texts[i] for i in valid]))) if valid else {}
+    results = []
+    for i, row in enumerate(rows):
+        p = preds.get(i)
+        results.append({
+            "row": first_row + i,
+            "id": row.get(id_column) if id_column else None,
+            "content": texts[i],
+            "verdict": verdict_label(p) if p else None,  # Empty rows are kept but not scored
+            "probability_fake": probability_fake(p) if p else None,
+            "embedding": p.embedding if p else None,  # Only stored in Mongo
+        })
+    return results
+
+
+def save_to_mongo(results):
+    now = datetime.utcnow()
+    docs = []
+    for r in results:
+        if r["verdict"] is None:
+            continue
+        doc = {"content": r["content"], "verdict": r["verdict"], "probability_fake": r["probability_fake"],
+               "timestamp": now}
+        if r["embedding"] is not None:
+            doc["embedding"] = encode_embedding(r["embedding"])
+        # Persist the MinHash signature like new_fact_check does; the index
+        # here only computes signatures, so memory does not grow with the input
+        signature = signatures.signature(r["content"]) if signatures is not None else None
+        if signature is not None:
+            doc["minhash"] = Binary(signature.tobytes())
+        docs.append(doc)
+    if docs:
+        insert_fact_checks(docs)  # Unordered; rows already stored (e.g. on resume) are skipped as duplicates
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KB on Linux; RUSAGE_CHILDREN is the largest worker process
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return own, children
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a CSV/JSONL/Parquet file of posts with BERT_Arch")
+    parser.add_argument("input")
+    parser.add_argument("--output", help="Output file (.jsonl or .csv)")
+    parser.add_argument("--to-mongo", action="store_true", help="Also insert verdicts into fact_checks")
+    parser.add_argument("--column", default="content", help="Column holding the post text")
+    parser.add_argument("--id-column", help="Column copied to the output to identify each row")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <output or input>.checkpoint)")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="Rows read and checkpointed at a time")
+    parser.add_argument("--batch-size", type=int, default=64, help="Texts per forward pass")
+    parser.add_argument("--workers", type=int, default=Config.INFERENCE_WORKERS or os.cpu_count(),
+                        help="Inference processes (0 = score in this process)")
+    parser.add_argument("--threads-per-worker", type=int, default=Config.INFERENCE_THREADS_PER_WORKER)
+    parser.add_argument("--embeddings", action="store_true",
+                        help="With --to-mongo, also store each post's pooled embedding (float16)")
+    args = parser.parse_args()
+
+    if not args.output and not args.to_mongo:
+        parser.error("give --output, --to-mongo or both")
+    if args.embeddings and not args.to_mongo:
+        parser.error("--embeddings is only stored with --to-mongo")
+    checkpoint_path = args.checkpoint or (args.output or args.input) + ".checkpoint"
+    checkpoint = load_checkpoint(checkpoint_path, args.input)
+    if checkpoint["rows_done"]:
+        print(f"Resuming {args.input} after {checkpoint['rows_done']} rows")
+
+    output = OutputFile(args.output, checkpoint["output_bytes"]) if args.output else None
+    predict, close = make_predictor(args.workers, args.threads_per_worker, args.batch_size, args.embeddings)
+    read_chunks = reader_for(args.input)
+
+    start = time.perf_counter()
+    scored = 0
+    try:
+        for rows in read_chunks(args.input, args.chunk_size, skip=checkpoint["rows_done"]):
+            results = score_chunk(rows, checkpoint["rows_done"], args.column, args.id_column, predict)
+            if output is not None:
+                checkpoint["output_bytes"] = output.write(results)
+            if args.to_mongo:
+                save_to_mongo(results)
+            checkpoint["rows_done"] += len(rows)
+            save_checkpoint(checkpoint_path, checkpoint)
+            scored += len(rows)
+            elapsed = time.perf_counter() - start
+            print(f"{checkpoint['rows_done']} rows scored ({scored / elapsed:.1f} rows/s)")
+    finally:
+        close()
+        if output is not None:
+            output.close()
+
+    elapsed = time.perf_counter() - start
+    own, children = peak_rss_mb()
+    workers_rss = f" (largest worker {children:.0f} MB)" if args.workers > 0 else ""
+    print(f"Done: {scored} rows in {elapsed:.1f}s ({scored / elapsed if elapsed else 0:.1f} rows/s), "
+          f"peak RSS {own:.0f} MB{workers_rss}")
+    print(f"Checkpoint: {checkpoint_path} (delete it to score {args.input} again from the start)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# cache.py - In-process LRU/TTL caches (verdicts, tokenized inputs)
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Bounded, thread-safe LRU cache with an optional TTL (in seconds) and
+    hit/miss/eviction counters. Callers normalize keys themselves; the verdict
+    cache uses models.content_key, so every spelling the Mongo collation
+    treats as equal shares one entry.
+    """
+
+    def __init__(self, max_size=50000, ttl=None):
+        self.max_size = max(1, int(max_size))
+        self.ttl = ttl or None
+        self._entries = OrderedDict()  # key -> (value, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, stored_at = entry
+            if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def ttl_remaining(self, key):
+        """
+        Seconds until `key` expires (inf without a TTL), or None if it is not
+        cached. Does not count as a hit or miss or refresh the LRU order.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self.ttl is None:
+            return float("inf")
+        remaining = self.ttl - (time.monotonic() - entry[1])
+        return remaining if remaining > 0 else None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
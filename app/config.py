@@ -1,2 +1,127 @@
+import os
+
+
 class Config:
-    MONGO_URI = 'mongodb://localhost:27017/clarifai_db'  # Change to your MongoDB URI
+    # MongoDB (app/db.py). One pooled client per process and URI; timeouts in ms.
+    MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
+    FACT_CHECK_DB = os.getenv("FACT_CHECK_DB", "misinformation_db")
+    USER_DB = os.getenv("USER_DB", "factcheck_db")
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 300000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 30000))
+
+    # Micro-batching of /api/fact-check inference: a batch is run as soon as it
+    # holds BATCH_MAX_SIZE texts or the oldest request has waited BATCH_MAX_WAIT_MS.
+    BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", 16))
+    BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 10))
+
+    # POST /api/fact-check/batch handles its input in chunks of this many contents:
+    # one Mongo lookup, one insert and one streamed block of results per chunk.
+    BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", 256))
+
+    # In-process verdict cache in front of the fact_checks collection.
+    # VERDICT_CACHE_TTL is in seconds; 0 keeps entries until they are evicted.
+    VERDICT_CACHE_SIZE = int(os.getenv("VERDICT_CACHE_SIZE", 50000))
+    VERDICT_CACHE_TTL = float(os.getenv("VERDICT_CACHE_TTL", 0))
+
+    # Model registry. Weights may be a torch checkpoint (.pt) or .safetensors;
+    # both are memory-mapped. With MODEL_PRELOAD the model is loaded when the app
+    # is created (before gunicorn forks workers), otherwise on the first request.
+    BERT_MODEL_NAME = os.getenv("BERT_MODEL_NAME", "bert-base-uncased")
+    MODEL_WEIGHTS_PATH = os.getenv(
+        "MODEL_WEIGHTS_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "c1_fakenews_weights.pt"),
+    )
+    MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "false").lower() in ("1", "true", "yes")
+
+    # Inference backend for predict_fake_news: fp32 (eager), int8 (dynamic
+    # quantization of the Linear layers) or torchscript (traced, frozen graph)
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "fp32").lower()
+
+    # Model outputs. Logits are divided by MODEL_TEMPERATURE before the softmax
+    # (temperature scaling; fit it offline on held-out data, 1.0 = as trained).
+    # New fact checks store probability_fake, and with STORE_EMBEDDINGS also the
+    # pooled [CLS] embedding as float16 bytes (1.5 KB per claim), so thresholds
+    # can be re-tuned offline without running BERT again.
+    MODEL_TEMPERATURE = float(os.getenv("MODEL_TEMPERATURE", 1.0))
+    STORE_EMBEDDINGS = os.getenv("STORE_EMBEDDINGS", "false").lower() in ("1", "true", "yes")
+
+    # Tokenization. Sequences are truncated to MODEL_MAX_LENGTH tokens and padded
+    # only to the longest sequence of their length bucket, so raising the max
+    # length costs nothing for short posts. TOKEN_CACHE_SIZE token-id lists are
+    # kept for repeated content.
+    MODEL_MAX_LENGTH = int(os.getenv("MODEL_MAX_LENGTH", 15))
+    TOKEN_LENGTH_BUCKETS = [int(b) for b in os.getenv("TOKEN_LENGTH_BUCKETS", "16,32,64,128,256,512").split(",")]
+    TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 20000))
+
+    # asyncio serving mode (app/asgi.py): Mongo connection pool size and the
+    # number of requests allowed to wait on the batching engine at once
+    ASYNC_MONGO_POOL_SIZE = int(os.getenv("ASYNC_MONGO_POOL_SIZE", 100))
+    ASYNC_MAX_INFLIGHT_INFERENCE = int(os.getenv("ASYNC_MAX_INFLIGHT_INFERENCE", 256))
+
+    # Multi-process inference. INFERENCE_WORKERS model processes (0 = run in the
+    # web process) share one copy of the weights in shared memory, each limited
+    # to INFERENCE_THREADS_PER_WORKER torch threads.
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))
+    INFERENCE_THREADS_PER_WORKER = int(os.getenv("INFERENCE_THREADS_PER_WORKER", 1))
+    # Seconds a worker may take for one batch; a worker that takes longer is
+    # considered hung, its batch fails and the worker is restarted
+    INFERENCE_WORKER_TIMEOUT = float(os.getenv("INFERENCE_WORKER_TIMEOUT", 120))
+
+    # Write-behind persistence of new verdicts: batches of up to WRITE_BATCH_SIZE
+    # are flushed every WRITE_FLUSH_INTERVAL seconds. When WRITE_MAX_PENDING
+    # documents are queued, callers wait up to WRITE_PUT_TIMEOUT seconds and
+    # then write synchronously.
+    WRITE_BEHIND = os.getenv("WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+    WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 500))
+    WRITE_FLUSH_INTERVAL = float(os.getenv("WRITE_FLUSH_INTERVAL", 1.0))
+    WRITE_MAX_PENDING = int(os.getenv("WRITE_MAX_PENDING", 10000))
+    WRITE_PUT_TIMEOUT = float(os.getenv("WRITE_PUT_TIMEOUT", 2.0))
+
+    # Near-duplicate claim lookup: a claim whose MinHash similarity to a stored
+    # claim is at least SIMILARITY_THRESHOLD gets that claim's verdict
+    SIMILARITY_ENABLED = os.getenv("SIMILARITY_ENABLED", "true").lower() in ("1", "true", "yes")
+    SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", 0.8))
+    # Claims held by each process's index (about 400 bytes each plus the claim
+    # text); the newest are kept
+    SIMILARITY_MAX_CLAIMS = int(os.getenv("SIMILARITY_MAX_CLAIMS", 500000))
+    # Seconds between reads of the claims other processes have saved since
+    # (0 = never). Until then a near-duplicate of one of them may be missed,
+    # depending on which worker serves the request
+    SIMILARITY_REFRESH_INTERVAL = float(os.getenv("SIMILARITY_REFRESH_INTERVAL", 30))
+
+    # Trending claims. Requests are counted per content over TRENDING_WINDOW
+    # seconds; concurrent requests for the same content always share one
+    # lookup and prediction. Every WARMER_INTERVAL seconds (0 = never) the
+    # WARMER_TOP_N most requested claims whose cached verdict is missing or
+    # expires within WARMER_REFRESH_AHEAD seconds are reloaded ahead of demand.
+    TRENDING_WINDOW = float(os.getenv("TRENDING_WINDOW", 600))
+    TRENDING_MAX_KEYS = int(os.getenv("TRENDING_MAX_KEYS", 10000))
+    WARMER_INTERVAL = float(os.getenv("WARMER_INTERVAL", 30))
+    WARMER_TOP_N = int(os.getenv("WARMER_TOP_N", 100))
+    WARMER_REFRESH_AHEAD = float(os.getenv("WARMER_REFRESH_AHEAD", 60))
+
+    # Admission control for the fact-check endpoints. Token buckets per client
+    # (the RATE_LIMIT_USER_HEADER header, e.g. X-API-Key, else the client
+    # address) and for the whole API: RATE is tokens per second (0 = no limit),
+    # BURST the bucket size. A batch request costs one token per content (an
+    # NDJSON stream one chunk's worth). RATE_LIMIT_STORE is "memory" (per
+    # process) or a redis:// URL to share buckets between processes and hosts.
+    # Requests that need the model are shed with 503 while SHED_QUEUE_DEPTH
+    # texts are already waiting for the batching engine (0 = never).
+    RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "memory")
+    RATE_LIMIT_USER_HEADER = os.getenv("RATE_LIMIT_USER_HEADER", "")
+    RATE_LIMIT_USER_RATE = float(os.getenv("RATE_LIMIT_USER_RATE", 0))
+    RATE_LIMIT_USER_BURST = int(os.getenv("RATE_LIMIT_USER_BURST", 20))
+    RATE_LIMIT_GLOBAL_RATE = float(os.getenv("RATE_LIMIT_GLOBAL_RATE", 0))
+    RATE_LIMIT_GLOBAL_BURST = int(os.getenv("RATE_LIMIT_GLOBAL_BURST", 500))
+    SHED_QUEUE_DEPTH = int(os.getenv("SHED_QUEUE_DEPTH", 2048))
+    SHED_RETRY_AFTER = float(os.getenv("SHED_RETRY_AFTER", 1))
+
+    # Metrics are served on GET /metrics. With SERVER_TIMING, single fact-check
+    # responses also carry a Server-Timing header with the request's breakdown
+    # (mongo_lookup, tokenize, forward, inference, mongo_insert, total), in ms.
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "false").lower() in ("1", "true", "yes")
@@ -0,0 +1,149 @@
+# db.py - Shared MongoDB access: one pooled client per process, indexes, projections
+#
+# Every Mongo user (the Flask/ASGI API, the bulk scorer, the Streamlit UI)
+# gets its client from get_client(), so a process holds one connection pool
+# per URI instead of one per import or per Streamlit rerun. Clients are keyed
+# by process id as well: a client created before a fork (gunicorn preload)
+# is not reused by the forked workers. Required indexes are created once per
+# process, the first time their collection is requested.
+import os
+import threading
+
+import numpy as np
+from bson import Binary
+from pymongo import ASCENDING, DESCENDING, MongoClient, errors
+
+from app.config import Config
+from app.metrics import MONGO_INSERT_SECONDS
+
+FACT_CHECK_DB = Config.FACT_CHECK_DB
+FACT_CHECKS = "fact_checks"
+USER_DB = Config.USER_DB
+USERS = "user_data"
+FEEDBACK = "feedback"
+FEEDBACK_STATS = "feedback_stats"
+CONTENT_COLLATION = {"locale": "en", "strength": 2}  # Case-insensitive, matches the unique index
+
+# Projections: read only the fields the caller uses. The MinHash signature is
+# only needed when the similarity index is built (app/similarity.py), the
+# embedding only by offline analysis.
+FACT_CHECK_PROJECTION = {"minhash": 0, "embedding": 0}
+USER_LOGIN_PROJECTION = {"_id": 0, "password": 1, "username": 1}
+USER_EXISTS_PROJECTION = {"_id": 1}
+
+_lock = threading.Lock()
+_index_lock = threading.Lock()
+_clients = {}      # (pid, uri) -> MongoClient
+_indexed = set()   # (pid, uri, db, collection) whose indexes were ensured
+
+
+def get_client(uri=None):
+    uri = uri or Config.MONGO_URI
+    key = (os.getpid(), uri)
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = MongoClient(
+                uri,
+                maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                minPoolSize=Config.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=Config.MONGO_MAX_IDLE_TIME_MS,
+                serverSelectionTimeoutMS=Config.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=Config.MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=Config.MONGO_SOCKET_TIMEOUT_MS,
+                retryWrites=True,
+            )
+            _clients[key] = client
+    return client
+
+
+def ensure_fact_check_indexes(collection):
+    # Case-insensitive unique index: lookups must use CONTENT_COLLATION to hit it
+    collection.create_index("content", unique=True, collation=CONTENT_COLLATION)
+
+
+def ensure_user_indexes(collection):
+    # login/signup look users up by email
+    try:
+        collection.create_index([("email", ASCENDING)], unique=True)
+    except errors.OperationFailure as e:
+        # Existing duplicate emails block the unique index; still avoid the collection scan
+        print(f"Could not create unique email index ({e}), creating a non-unique one")
+        collection.create_index([("email", ASCENDING)], name="email_lookup")
+
+
+def ensure_feedback_indexes(collection):
+    # Pages are read newest first (by _id), overall or for one user
+    collection.create_index([("email", ASCENDING), ("_id", DESCENDING)])
+    # Entries copied from the old embedded arrays, so the migration can be re-run
+    collection.create_index("legacy_key", unique=True, sparse=True)
+
+
+INDEXES = {
+    FACT_CHECKS: ensure_fact_check_indexes,
+    USERS: ensure_user_indexes,
+    FEEDBACK: ensure_feedback_indexes,
+}
+
+
+def get_collection(db_name, collection_name, uri=None):
+    """Returns the collection, creating its required indexes on first use in this process."""
+    collection = get_client(uri)[db_name][collection_name]
+    key = (os.getpid(), uri or Config.MONGO_URI, db_name, collection_name)
+    if key not in _indexed and collection_name in INDEXES:
+        with _index_lock:
+            if key not in _indexed:
+                # Tried once per process either way, so an unreachable server
+                # does not stall every later call on index creation
+                _indexed.add(key)
+                try:
+                    INDEXES[collection_name](collection)
+                    print(f"Checked indexes on {db_name}.{collection_name}")
+                except errors.PyMongoError as e:
+                    print(f"Error creating indexes on {db_name}.{collection_name}: {e}")
+    return collection
+
+
+def fact_checks_collection(uri=None):
+    return get_collection(FACT_CHECK_DB, FACT_CHECKS, uri)
+
+
+# --- fact_checks documents ---
+# Kept here rather than in app.models, so offline tools (app/bulk_score.py)
+# can write fact checks without building the verdict cache and write buffer
+def encode_embedding(embedding):
+    return Binary(np.asarray(embedding, dtype="<f2").tobytes())
+
+
+def decode_embedding(data):
+    """The pooled embedding stored with a fact check, as a float16 array."""
+    return np.frombuffer(data, dtype="<f2")
+
+
+def insert_fact_checks(docs, uri=None):
+    """
+    Inserts documents with one unordered insert_many. Duplicates are skipped
+    without stopping the rest of the batch; connection errors propagate.
+    """
+    try:
+        with MONGO_INSERT_SECONDS.time():
+            result = fact_checks_collection(uri).insert_many(docs, ordered=False)
+        print(f"Successfully inserted {len(result.inserted_ids)} fact checks")
+    except errors.BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        duplicates = sum(1 for err in write_errors if err.get("code") == 11000)
+        print(f"Inserted {e.details.get('nInserted', 0)} fact checks, skipped {duplicates} duplicates")
+        if duplicates < len(write_errors):
+            print(f"Error inserting into MongoDB: {len(write_errors) - duplicates} failed writes")
+
+
+def users_collection(uri=None):
+    return get_collection(USER_DB, USERS, uri)
+
+
+def find_user_for_login(email, uri=None):
+    return users_collection(uri).find_one({"email": email}, USER_LOGIN_PROJECTION)
+
+
+def user_exists(email, uri=None):
+    return users_collection(uri).find_one({"email": email}, USER_EXISTS_PROJECTION) is not None
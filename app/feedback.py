@@ -0,0 +1,216 @@
+# feedback.py - User feedback in its own collection, with pre-aggregated stats
+#
+# Each feedback entry is one document in `feedback` (indexed by email and _id)
+# instead of an element of an ever-growing array inside the user document.
+# Every insert also $inc's two documents in `feedback_stats`: the running
+# totals ("all") and the totals of that UTC day ("day:YYYY-MM-DD"), so
+# dashboards read a handful of small documents instead of scanning feedback.
+#
+# Move the arrays of existing users with:
+#   python -m app.feedback migrate
+# and print the current statistics with:
+#   python -m app.feedback stats --days 7
+import argparse
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from pymongo import DESCENDING, InsertOne, UpdateOne, errors
+
+from app.db import FEEDBACK, FEEDBACK_STATS, USER_DB, get_collection, users_collection
+
+RATINGS = ("1", "2", "3", "4", "5")
+ALL_TIME = "all"
+
+
+def feedback_collection(uri=None):
+    return get_collection(USER_DB, FEEDBACK, uri)
+
+
+def stats_collection(uri=None):
+    return get_collection(USER_DB, FEEDBACK_STATS, uri)
+
+
+def day_key(moment):
+    return f"day:{moment.strftime('%Y-%m-%d')}"
+
+
+def _stats_increment(accuracy, experience, count=1):
+    return {
+        "count": count,
+        "accuracy_sum": accuracy * count,
+        "experience_sum": experience * count,
+        f"accuracy.{accuracy}": count,
+        f"experience.{experience}": count,
+    }
+
+
+def _increment_stats(entries, uri=None):
+    """$inc's the all-time and daily statistics by each entry's accuracy and experience."""
+    increments = {}
+    for entry in entries:
+        for stats_id in (ALL_TIME, day_key(entry["created_at"])):
+            totals = increments.setdefault(stats_id, {})
+            for field, value in _stats_increment(entry["accuracy"], entry["experience"]).items():
+                totals[field] = totals.get(field, 0) + value
+    if increments:
+        now = datetime.utcnow()
+        stats_collection(uri).bulk_write([
+            UpdateOne({"_id": stats_id}, {"$inc": totals, "$set": {"updated_at": now}}, upsert=True)
+            for stats_id, totals in increments.items()
+        ], ordered=False)
+
+
+def add_feedback(email, accuracy, experience, comments, uri=None):
+    """Stores one feedback entry and updates the all-time and daily statistics."""
+    doc = {"email": email, "accuracy": int(accuracy), "experience": int(experience),
+           "comments": comments, "created_at": datetime.utcnow()}
+    feedback_collection(uri).insert_one(doc)
+    _increment_stats([doc], uri)
+    return doc["_id"]
+
+
+def list_feedback(email=None, limit=20, before=None, uri=None):
+    """
+    Returns (entries, next_cursor), newest first. Pass next_cursor back as
+    `before` for the next page; it is None on the last page. Pages are
+    keyed on _id, so each one is a single index range scan.
+    """
+    query = {}
+    if email is not None:
+        query["email"] = email
+    if before is not None:
+        query["_id"] = {"$lt": ObjectId(before)}
+    entries = list(feedback_collection(uri).find(query).sort("_id", DESCENDING).limit(limit + 1))
+    next_cursor = str(entries[limit - 1]["_id"]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def _summarize(doc):
+    doc = doc or {}
+    count = doc.get("count", 0)
+    return {
+        "count": count,
+        "accuracy_avg": doc.get("accuracy_sum", 0) / count if count else None,
+        "experience_avg": doc.get("experience_sum", 0) / count if count else None,
+        "accuracy_distribution": {r: doc.get("accuracy", {}).get(r, 0) for r in RATINGS},
+        "experience_distribution": {r: doc.get("experience", {}).get(r, 0) for r in RATINGS},
+    }
+
+
+def feedback_stats(uri=None):
+    """All-time statistics: count, averages and rating distributions."""
+    return _summarize(stats_collection(uri).find_one({"_id": ALL_TIME}))
+
+
+def daily_feedback_stats(days=30, uri=None):
+    """Statistics for each of the last `days` UTC days, oldest first."""
+    today = datetime.utcnow()
+    keys = [day_key(today - timedelta(days=n)) for n in range(days - 1, -1, -1)]
+    docs = {doc["_id"]: doc for doc in stats_collection(uri).find({"_id": {"$in": keys}})}
+    return [{"day": key[len("day:"):], **_summarize(docs.get(key))} for key in keys]
+
+
+def rebuild_stats(uri=None):
+    """
+    Recomputes feedback_stats from the feedback collection with one
+    aggregation. Only needed after a manual edit; run it while no feedback
+    is being submitted, as increments made during the rebuild are lost. The
+    statistics are built in a separate collection and renamed into place,
+    so readers never see them empty.
+    """
+    pipeline = [{"$group": {
+        "_id": {"day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                "accuracy": "$accuracy", "experience": "$experience"},
+        "count": {"$sum": 1},
+    }}]
+    totals = {}
+    for group in feedback_collection(uri).aggregate(pipeline):
+        key = group["_id"]
+        for stats_id in (ALL_TIME, f"day:{key['day']}"):
+            doc = totals.setdefault(stats_id, {"_id": stats_id, "count": 0, "accuracy_sum": 0,
+                                               "experience_sum": 0, "accuracy": {}, "experience": {}})
+            for field, value in _stats_increment(key["accuracy"], key["experience"], group["count"]).items():
+                if "." in field:
+                    name, rating = field.split(".")
+                    doc[name][rating] = doc[name].get(rating, 0) + value
+                else:
+                    doc[field] += value
+    now = datetime.utcnow()
+    rebuilt = get_collection(USER_DB, FEEDBACK_STATS + "_rebuild", uri)
+    rebuilt.drop()
+    if not totals:
+        stats_collection(uri).delete_many({})
+        return 0
+    rebuilt.insert_many([{**doc, "updated_at": now} for doc in totals.values()])
+    rebuilt.rename(FEEDBACK_STATS, dropTarget=True)
+    return len(totals)
+
+
+def migrate_embedded_feedback(uri=None, batch_size=500):
+    """
+    Copies every user's embedded `feedback` array into the feedback
+    collection and removes the array. Safe to re-run against a live
+    deployment: copied entries carry a unique legacy_key, an array is only
+    removed if it did not change while it was being copied, and the
+    statistics are $inc'ed for the entries actually inserted, so feedback
+    submitted meanwhile is still counted. A run interrupted between copying
+    a user's entries and counting them leaves the totals short; run
+    rebuild-stats once afterwards to repair them.
+    """
+    users = users_collection(uri)
+    feedback = feedback_collection(uri)
+    migrated_users = migrated_entries = 0
+    cursor = users.find({"feedback.0": {"$exists": True}}, {"email": 1, "feedback": 1}, batch_size=batch_size)
+    for user in cursor:
+        user_id = user["_id"]
+        # The array has no timestamps; the account's creation time is the best we have
+        created_at = user_id.generation_time.replace(tzinfo=None) if isinstance(user_id, ObjectId) \
+            else datetime.utcnow()
+        docs = [{
+            "email": user.get("email"),
+            "accuracy": int(entry.get("accuracy", 0)),
+            "experience": int(entry.get("experience", 0)),
+            "comments": entry.get("comments", ""),
+            "created_at": created_at,
+            "legacy_key": f"{user_id}:{i}",
+        } for i, entry in enumerate(user["feedback"])]
+        failed = []
+        try:
+            feedback.bulk_write([InsertOne(doc) for doc in docs], ordered=False)
+            inserted = docs
+        except errors.BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            rejected = {err["index"] for err in write_errors}
+            inserted = [doc for i, doc in enumerate(docs) if i not in rejected]
+            # Duplicates were copied (and counted) by an earlier run
+            failed = [err for err in write_errors if err.get("code") != 11000]
+        _increment_stats(inserted, uri)
+        migrated_entries += len(inserted)
+        if failed:
+            print(f"Could not migrate feedback of {user.get('email')}: {failed[0].get('errmsg')}")
+            continue  # Keep the array; the next run retries
+        users.update_one({"_id": user_id, "feedback": user["feedback"]}, {"$unset": {"feedback": ""}})
+        migrated_users += 1
+    print(f"Migrated {migrated_entries} feedback entries from {migrated_users} users")
+    return migrated_users, migrated_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User feedback maintenance")
+    parser.add_argument("command", choices=["migrate", "rebuild-stats", "stats"])
+    parser.add_argument("--mongo-uri", help="Defaults to Config.MONGO_URI")
+    parser.add_argument("--days", type=int, default=7, help="Days of daily statistics to print")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        migrate_embedded_feedback(args.mongo_uri)
+    elif args.command == "rebuild-stats":
+        print(f"Rebuilt feedback statistics ({rebuild_stats(args.mongo_uri)} documents)")
+    else:
+        print(feedback_stats(args.mongo_uri))
+        for day in daily_feedback_stats(args.days, args.mongo_uri):
+            print(day)
+
+
+if __name__ == "__main__":
+    main()
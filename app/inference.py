@@ -0,0 +1,79 @@
+# inference.py - BERT_Arch prediction on tokenized or raw texts
+from collections import namedtuple
+
+import numpy as np
+import torch
+
+from app.config import Config
+from app.metrics import MODEL_FORWARD_SECONDS
+from app.model_registry import get_model
+from app.tokenization import bucketed_batches, encode
+
+# label: argmax class (1 = fake); probabilities: softmax over the classes;
+# embedding: pooled [CLS] vector as float16, or None when not requested
+Prediction = namedtuple("Prediction", ["label", "probabilities", "embedding"])
+
+
+def predict_outputs(model, sequences, pad_token_id=None, embeddings=False):
+    """
+    Runs token-id sequences through the model, one forward pass per length
+    bucket, and returns one Prediction per sequence. Probabilities and
+    embeddings come from the same forward pass as the label. Logits are
+    divided by Config.MODEL_TEMPERATURE before the softmax (temperature
+    scaling), which changes the probabilities but never the label.
+    """
+    outputs = [None] * len(sequences)
+    for indices, unseen_seq, unseen_mask in bucketed_batches(sequences, pad_token_id=pad_token_id):
+        with torch.no_grad(), MODEL_FORWARD_SECONDS.time():
+            if embeddings:
+                logits, pooled = model.forward_features(unseen_seq, unseen_mask)
+                pooled = pooled.cpu().numpy().astype(np.float16)
+            else:
+                logits, pooled = model(unseen_seq, attention_mask=unseen_mask), None
+            probs = torch.softmax(logits / Config.MODEL_TEMPERATURE, dim=1).cpu().numpy()
+        for j, (i, row) in enumerate(zip(indices, probs)):
+            outputs[i] = Prediction(int(row.argmax()), [float(p) for p in row],
+                                    pooled[j] if pooled is not None else None)
+    return outputs
+
+
+def predict_sequences(model, sequences, pad_token_id=None):
+    """Like predict_outputs, but returns only the label of each sequence."""
+    return [p.label for p in predict_outputs(model, sequences, pad_token_id)]
+
+
+def predict_probabilities(model, sequences, pad_token_id=None):
+    """Like predict_outputs, but returns only the class probabilities of each sequence."""
+    return [p.probabilities for p in predict_outputs(model, sequences, pad_token_id)]
+
+
+def verdict_label(prediction):
+    # A Prediction or a bare class index
+    label = prediction.label if isinstance(prediction, Prediction) else prediction
+    return "Fake" if label == 1 else "True"
+
+
+def probability_fake(prediction):
+    return round(prediction.probabilities[1], 6)
+
+
+def predict_fake_news_batch(texts, model=None, max_length=None):
+    if model is None:
+        model = get_model()  # Loaded on first use unless preloaded at startup
+    return predict_sequences(model, encode(list(texts), max_length))
+
+
+def predict_fake_news_proba_batch(texts, model=None, max_length=None):
+    if model is None:
+        model = get_model()
+    return predict_probabilities(model, encode(list(texts), max_length))
+
+
+def predict_fake_news_outputs(texts, model=None, max_length=None, embeddings=False):
+    if model is None:
+        model = get_model()
+    return predict_outputs(model, encode(list(texts), max_length), embeddings=embeddings)
+
+
+def predict_fake_news(text_input):
+    return predict_fake_news_batch([text_input])[0]
@@ -0,0 +1,216 @@
+# metrics.py - Prometheus-style latency histograms, counters and gauges
+#
+# Metrics live in this process and are rendered in the Prometheus text format
+# by render() (served on GET /metrics). Every histogram observation is also
+# added to the timing breakdown of the current request, if one was started
+# with start_timings(), which the API can return as a Server-Timing header.
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_registry = []
+_registry_lock = threading.Lock()
+_timings = contextvars.ContextVar("timings", default=None)
+
+
+def _register(metric):
+    with _registry_lock:
+        _registry.append(metric)
+    return metric
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram. With `timing_name`, observations are also
+    added to the current request's timing breakdown under that name.
+    """
+
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, timing_name=None):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self.timing_name = timing_name
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+        _register(self)
+
+    def observe(self, value):
+        with self._lock:
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+                    break
+            self._sum += value
+        if self.timing_name:
+            record_timing(self.timing_name, value)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def timed(self, function):
+        """Decorator form of time()."""
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with self.time():
+                return function(*args, **kwargs)
+        return wrapper
+
+    def collect(self):
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Counter:
+    """A monotonically increasing count, incremented directly or read from `function` at scrape time."""
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self._value = 0
+        self._lock = threading.Lock()
+        _register(self)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def collect(self):
+        try:
+            value = self.function() if self.function else self._value
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter",
+                f"{self.name} {_format(value)}"]
+
+
+class Gauge:
+    """A value that is set directly, or read from `function` at scrape time."""
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self._value = 0
+        _register(self)
+
+    def set(self, value):
+        self._value = value
+
+    def collect(self):
+        try:
+            value = self.function() if self.function else self._value
+        except Exception:
+            return []  # e.g. the object it reads from is not ready yet
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format(value)}"]
+
+
+def render():
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# --- Per-request timing breakdown ---
+def start_timings():
+    """Starts a timing breakdown for the current request (thread or task) and returns it."""
+    timings = {}
+    _timings.set(timings)
+    return timings
+
+
+def current_timings():
+    return _timings.get()
+
+
+def record_timing(name, seconds):
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def merge_timings(other):
+    """Adds a breakdown recorded elsewhere (e.g. by the batching thread) to the current one."""
+    for name, seconds in (other or {}).items():
+        record_timing(name, seconds)
+
+
+def server_timing_header(timings):
+    # Server-Timing durations are in milliseconds
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+# --- Standalone exporter, for processes without the Flask app (e.g. Streamlit) ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # One line per scrape is noise
+
+
+def start_http_server(port, host="0.0.0.0"):
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
+
+
+# --- Hot-path metrics ---
+MONGO_LOOKUP_SECONDS = Histogram("clarifai_mongo_lookup_seconds",
+                                 "Time spent in fact_checks lookups that reached Mongo", timing_name="mongo_lookup")
+TOKENIZATION_SECONDS = Histogram("clarifai_tokenization_seconds",
+                                 "Time spent tokenizing a batch of texts", timing_name="tokenize")
+MODEL_FORWARD_SECONDS = Histogram("clarifai_model_forward_seconds",
+                                  "Time spent in BERT_Arch forward passes", timing_name="forward")
+MONGO_INSERT_SECONDS = Histogram("clarifai_mongo_insert_seconds",
+                                 "Time spent inserting fact checks into Mongo", timing_name="mongo_insert")
+FACTCHECK_API_SECONDS = Histogram("clarifai_factcheck_api_seconds",
+                                  "Latency of Google Fact Check Tools API requests", timing_name="factcheck_api")
+FACTCHECK_QUERY_SECONDS = Histogram("clarifai_factcheck_query_seconds",
+                                    "Time to fetch, label and score the claims of one Streamlit query")
+PAGE_RENDER_SECONDS = Histogram("clarifai_page_render_seconds",
+                                "Time of one run of the Streamlit script (a page load or rerun)")
+FACTCHECK_API_ERRORS = Counter("clarifai_factcheck_api_errors_total",
+                               "Google Fact Check Tools API requests that failed")
+INFERENCE_WAIT_SECONDS = Histogram("clarifai_inference_wait_seconds",
+                                   "Time a request waited for its prediction, including queueing",
+                                   timing_name="inference")
+BATCH_SIZE = Histogram("clarifai_inference_batch_size", "Texts per batch run by the batching engine",
+                       buckets=SIZE_BUCKETS)
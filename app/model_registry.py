@@ -0,0 +1,157 @@
+# model_registry.py - Loads BERT_Arch and its tokenizer once per process
+import os
+import threading
+import time
+
+import torch
+import torch.nn as nn
+from transformers import AutoConfig, AutoModel, BertTokenizerFast
+
+from app.config import Config
+
+
+class BERT_Arch(nn.Module):
+    def __init__(self, bert):
+        super(BERT_Arch, self).__init__()
+        self.bert = bert
+        self.dropout = nn.Dropout(0.1)
+        self.relu = nn.ReLU()
+        self.fc1 = nn.Linear(768, 512)
+        self.fc2 = nn.Linear(512, 2)  # Output layer
+
+    def forward(self, sent_id, attention_mask):
+        return self.forward_features(sent_id, attention_mask)[0]
+
+    def forward_features(self, sent_id, attention_mask):
+        """Logits and the pooled [CLS] embedding they were computed from, in one pass."""
+        cls_hs = self.bert(sent_id, attention_mask=attention_mask)['pooler_output']
+        x = self.fc1(cls_hs)
+        x = self.relu(x)
+        x = self.dropout(x)
+        x = self.fc2(x)  # Output layer
+        return x, cls_hs
+
+
+_lock = threading.Lock()
+_tokenizer_lock = threading.Lock()
+_model = None
+_tokenizer = None
+
+
+def memory_usage_mb():
+    """
+    Returns (rss, pss) of this process in MB. PSS splits shared pages between
+    the processes mapping them, so it shows what copy-on-write sharing saves.
+    PSS is None where /proc/self/smaps_rollup is unavailable.
+    """
+    rss = pss = None
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Rss:"):
+                    rss = int(line.split()[1]) / 1024
+                elif line.startswith("Pss:"):
+                    pss = int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # Peak RSS, KB on Linux
+    return rss, pss
+
+
+def load_state_dict(path):
+    """
+    Loads fine-tuned weights without an extra in-memory copy: safetensors and
+    torch.load(mmap=True) map the file, so the tensors are backed by the page
+    cache and shared between every process that loads the same file.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model weights file not found: {path} (set MODEL_WEIGHTS_PATH)")
+    if path.endswith(".safetensors"):
+        from safetensors.torch import load_file
+        return load_file(path, device="cpu")
+    return torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+
+
+def build_model(weights_path=None, model_name=None):
+    weights_path = weights_path or Config.MODEL_WEIGHTS_PATH
+    model_name = model_name or Config.BERT_MODEL_NAME
+    state_dict = load_state_dict(weights_path)
+
+    if any(key.startswith("bert.") for key in state_dict):
+        # The checkpoint has every BERT weight: build the architecture only,
+        # instead of loading pretrained weights that are overwritten right away
+        bert = AutoModel.from_config(AutoConfig.from_pretrained(model_name))
+    else:
+        bert = AutoModel.from_pretrained(model_name)
+
+    model = BERT_Arch(bert)
+    # assign=True keeps the (memory-mapped) checkpoint tensors as the parameters
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    model.eval()
+    return model
+
+
+# --- Inference backends ---
+INFERENCE_BACKENDS = ("fp32", "int8", "torchscript")
+
+
+def apply_backend(model, backend, tokenizer):
+    """
+    Turns the fp32 eager model into the requested inference backend. Every
+    backend is called the same way: backend_model(input_ids, attention_mask=mask),
+    and backend_model.forward_features(input_ids, mask) for logits plus embeddings.
+      fp32        - the eager model as trained
+      int8        - dynamic int8 quantization of the Linear layers (weights
+                    stored as int8, activations quantized on the fly)
+      torchscript - traced and frozen graph, no Python dispatch per layer
+    """
+    if backend == "fp32":
+        return model
+    if backend == "int8":
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+    if backend == "torchscript":
+        example = tokenizer(["example input for tracing"], padding=True, return_tensors="pt")
+        inputs = (example["input_ids"], example["attention_mask"])
+        with torch.no_grad():
+            traced = torch.jit.trace_module(model, {"forward": inputs, "forward_features": inputs}, strict=False)
+        frozen = torch.jit.freeze(traced, preserved_attrs=["forward_features"])
+        return torch.jit.optimize_for_inference(frozen, other_methods=["forward_features"])
+    raise ValueError(f"Unknown INFERENCE_BACKEND {backend!r}, expected one of {INFERENCE_BACKENDS}")
+
+
+def _load():
+    global _model
+    start = time.perf_counter()
+    _model = apply_backend(build_model(), Config.INFERENCE_BACKEND, get_tokenizer())
+    rss, pss = memory_usage_mb()
+    pss_text = f", PSS {pss:.0f} MB" if pss is not None else ""
+    print(f"Model weights loaded from: {Config.MODEL_WEIGHTS_PATH} ({Config.INFERENCE_BACKEND}) "
+          f"in {time.perf_counter() - start:.2f}s (pid {os.getpid()}, RSS {rss:.0f} MB{pss_text})")
+
+
+def preload():
+    """Eager load, e.g. in the gunicorn master before workers are forked."""
+    get_model()
+
+
+def is_loaded():
+    return _model is not None
+
+
+def get_model():
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _load()
+    return _model
+
+
+def get_tokenizer():
+    # Loaded on its own: processes that only tokenize (e.g. in front of the
+    # worker pool) never pay for the model
+    global _tokenizer
+    if _tokenizer is None:
+        with _tokenizer_lock:
+            if _tokenizer is None:
+                _tokenizer = BertTokenizerFast.from_pretrained(Config.BERT_MODEL_NAME)
+    return _tokenizer
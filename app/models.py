@@ -1,35 +1,154 @@
-from pymongo import MongoClient, errors  # Import errors for DuplicateKeyError
+from pymongo import errors  # Import errors for DuplicateKeyError
+from bson import Binary
 from datetime import datetime
+import unicodedata
+from app.cache import LRUCache
+from app.db import (CONTENT_COLLATION, FACT_CHECK_PROJECTION, encode_embedding, fact_checks_collection,
+                    insert_fact_checks)
+from app.write_behind import WriteBehindBuffer
+from app.similarity import SimilarClaimIndex
+from app.config import Config
+from app.metrics import MONGO_INSERT_SECONDS, MONGO_LOOKUP_SECONDS, Counter, Gauge
 
-MONGO_URI = "mongodb://localhost:27017/"  # Replace with your URI
-DB_NAME = "misinformation_db"
-COLLECTION_NAME = "fact_checks"
+# Hot claims are answered from memory and never reach Mongo
+verdict_cache = LRUCache(Config.VERDICT_CACHE_SIZE, Config.VERDICT_CACHE_TTL)
+Counter("clarifai_verdict_cache_hits_total", "Verdict cache hits", lambda: verdict_cache.stats()["hits"])
+Counter("clarifai_verdict_cache_misses_total", "Verdict cache misses", lambda: verdict_cache.stats()["misses"])
+Gauge("clarifai_verdict_cache_hit_ratio", "Verdict cache hit ratio", lambda: verdict_cache.stats()["hit_ratio"])
+Gauge("clarifai_verdict_cache_size", "Verdicts held in the cache", lambda: len(verdict_cache))
 
-try:
-    client = MongoClient(MONGO_URI)
-    db = client[DB_NAME]
-    collection = db[COLLECTION_NAME]
+# Near-duplicate lookups (reworded/retweeted claims), built from the stored claims
+# by each process on its first lookup and refreshed with the claims other
+# processes save
+similar_index = None
+if Config.SIMILARITY_ENABLED:
+    similar_index = SimilarClaimIndex(threshold=Config.SIMILARITY_THRESHOLD, max_claims=Config.SIMILARITY_MAX_CLAIMS)
 
-    # Create unique index (do this ONCE, when the app starts)
-    collection.create_index("content", unique=True, collation={"locale": "en", "strength": 2})  # Case-insensitive unique index
-    print("Successfully connected to MongoDB and created/checked unique index.")
-
-except Exception as e:
-    print(f"Error connecting to MongoDB or creating index: {e}")
-    exit()
+def content_key(content):
+    # Mirrors the case-insensitive collation on `content`, so two texts the index
+    # treats as duplicates map to the same key
+    return unicodedata.normalize("NFC", content).casefold()
 
 def get_fact_check(content):
-    return collection.find_one({"content": content})
+    key = content_key(content)
+    doc = verdict_cache.get(key)
+    if doc is None:
+        # Query with the index collation, otherwise Mongo cannot use the index
+        with MONGO_LOOKUP_SECONDS.time():
+            doc = fact_checks_collection().find_one({"content": content}, FACT_CHECK_PROJECTION,
+                                                    collation=CONTENT_COLLATION)
+        if doc:
+            verdict_cache.set(key, doc)
+    return doc
+
+def get_fact_checks(contents):
+    """
+    Looks up many contents: cache hits are served from memory, the rest
+    with a single $in query. Returns a dict mapping content_key(content) -> stored document.
+    """
+    found = {}
+    missing = []
+    for content in contents:
+        key = content_key(content)
+        doc = verdict_cache.get(key)
+        if doc is None:
+            missing.append(content)
+        else:
+            found[key] = doc
+    if missing:
+        found.update(load_fact_checks(missing))
+    return found
+
+def load_fact_checks(contents):
+    """
+    Reads contents from Mongo with a single $in query, bypassing the cache,
+    and (re)caches what was found. Returns {content_key(content): document}.
+    """
+    found = {}
+    with MONGO_LOOKUP_SECONDS.time():
+        docs = list(fact_checks_collection().find({"content": {"$in": contents}}, FACT_CHECK_PROJECTION,
+                                                  collation=CONTENT_COLLATION))
+    for doc in docs:
+        key = content_key(doc["content"])
+        verdict_cache.set(key, doc)
+        found[key] = doc
+    return found
+
+def find_similar_fact_check(content):
+    """
+    Returns {"content", "verdict", "similarity"} for the most similar stored
+    claim above Config.SIMILARITY_THRESHOLD, or None.
+    """
+    if similar_index is None:
+        return None
+    similar_index.start_loading(fact_checks_collection, Config.SIMILARITY_REFRESH_INTERVAL)
+    match = similar_index.lookup(content)
+    if match is None:
+        return None
+    matched_content, verdict, similarity = match
+    return {"content": matched_content, "verdict": verdict, "similarity": similarity}
 
-def save_fact_check(content, verdict):
+def cached_view(doc):
+    # What the verdict cache holds: the document as FACT_CHECK_PROJECTION reads it
+    return {k: v for k, v in doc.items() if k not in FACT_CHECK_PROJECTION}
+
+def new_fact_check(content, verdict, timestamp, prediction=None):
+    doc = {"content": content, "verdict": verdict, "timestamp": timestamp}
+    if prediction is not None:
+        # Model outputs from the same forward pass, kept for offline threshold tuning
+        doc["probability_fake"] = round(prediction.probabilities[1], 6)
+        if prediction.embedding is not None:
+            doc["embedding"] = encode_embedding(prediction.embedding)
+    if similar_index is not None:
+        # The MinHash signature is stored with the claim, so the index can be
+        # rebuilt at startup without re-hashing every claim
+        signature = similar_index.signature(content)
+        if signature is not None:
+            doc["minhash"] = Binary(signature.tobytes())
+            similar_index.add(content, verdict, signature)
+    return doc
+
+# New verdicts are written in the background, in batches (see Config.WRITE_BEHIND)
+write_buffer = WriteBehindBuffer(
+    insert_fact_checks,
+    max_batch_size=Config.WRITE_BATCH_SIZE,
+    flush_interval=Config.WRITE_FLUSH_INTERVAL,
+    max_pending=Config.WRITE_MAX_PENDING,
+    put_timeout=Config.WRITE_PUT_TIMEOUT,
+) if Config.WRITE_BEHIND else None
+if write_buffer is not None:
+    Gauge("clarifai_write_buffer_pending", "Verdicts waiting to be written to Mongo", write_buffer.pending)
+
+def save_fact_check(content, verdict, prediction=None):
+    doc = new_fact_check(content, verdict, datetime.utcnow(), prediction)
+    # Cached first, so the verdict is served from memory before the write lands
+    verdict_cache.set(content_key(content), cached_view(doc))
+    if write_buffer is not None and write_buffer.add(doc):
+        return
     try:
-        result = collection.insert_one({
-            "content": content,
-            "verdict": verdict,
-            "timestamp": datetime.utcnow()
-        })
+        with MONGO_INSERT_SECONDS.time():
+            result = fact_checks_collection().insert_one(doc)
         print(f"Successfully inserted: {content} (Inserted ID: {result.inserted_id})")
     except errors.DuplicateKeyError:  # Catch DuplicateKeyError specifically
         print(f"Duplicate content, not inserted: {content}")
     except Exception as e: # Catch other errors
-        print(f"Error inserting into MongoDB: {e}")
\ No newline at end of file
+        print(f"Error inserting into MongoDB: {e}")
+
+def save_fact_checks(verdicts):
+    """
+    Saves many (content, verdict) or (content, verdict, prediction) tuples
+    through the write buffer, or with one insert_many.
+    """
+    if not verdicts:
+        return
+    now = datetime.utcnow()
+    docs = [new_fact_check(content, verdict, now, *prediction) for content, verdict, *prediction in verdicts]
+    for doc in docs:
+        verdict_cache.set(content_key(doc["content"]), cached_view(doc))
+    if write_buffer is not None:
+        docs = write_buffer.add_many(docs)  # Whatever did not fit is written directly
+    if docs:
+        try:
+            insert_fact_checks(docs)
+        except Exception as e:
+            print(f"Error inserting into MongoDB: {e}")
@@ -0,0 +1,196 @@
+# ratelimit.py - Token-bucket rate limiting and queue-depth load shedding
+#
+# Expensive work (model inference, Google Fact Check API calls) is admitted
+# through a RateLimiter (one token bucket per user plus one for everybody)
+# and a LoadShedder (rejects new work while too much is already queued).
+# Rejected requests fail fast with RequestRejected, which the API turns into
+# a 429/503 response with a Retry-After header, instead of waiting in a
+# queue until they time out.
+#
+# Buckets live in a store: MemoryBucketStore keeps them in this process;
+# RedisBucketStore (needs the `redis` package) shares them between processes
+# and hosts. make_store("memory") or make_store("redis://host:6379/0").
+# A store with `blocking` set does network I/O, so async code must not call
+# it on the event loop (see app/asgi.py).
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from app.metrics import Counter
+
+RATE_LIMITED = Counter("clarifai_rate_limited_total", "Requests rejected by a rate limit (429)")
+LOAD_SHED = Counter("clarifai_load_shed_total", "Requests rejected because the work queue was full (503)")
+
+
+class RequestRejected(Exception):
+    """A request turned away by rate limiting (status 429) or load shedding (503)."""
+
+    def __init__(self, status, message, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        # Retry-After takes whole seconds
+        return str(max(1, math.ceil(self.retry_after)))
+
+    def body(self):
+        return {"error": self.message, "retry_after": round(self.retry_after, 3)}
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in this process. At most `max_keys` buckets are kept;
+    the least recently used are dropped, which only ever lets a forgotten
+    user start again with a full bucket.
+    """
+
+    blocking = False  # take_all() does no I/O
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def take_all(self, buckets):
+        """
+        Takes tokens from several buckets, all or none. `buckets` is a list of
+        (key, rate, burst, cost): `cost` tokens from bucket `key`, refilled at
+        `rate` tokens per second up to `burst`. Returns, per bucket, 0 or the
+        seconds until its tokens would be available; tokens are only taken
+        when every bucket has enough.
+        """
+        now = time.monotonic()
+        with self._lock:
+            levels, waits = [], []
+            for key, rate, burst, cost in buckets:
+                tokens, updated_at = self._buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - updated_at) * rate)
+                levels.append(tokens)
+                waits.append(0.0 if tokens >= cost else (cost - tokens) / rate)
+            taken = not any(waits)
+            for (key, rate, burst, cost), tokens in zip(buckets, levels):
+                self._buckets[key] = (tokens - cost if taken else tokens, now)
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return waits
+
+    def take(self, key, rate, burst, cost=1):
+        return self.take_all([(key, rate, burst, cost)])[0]
+
+
+# Same algorithm as MemoryBucketStore.take_all, run atomically inside Redis
+# with the server's clock, so every process sharing the store agrees on the state
+_TAKE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local levels, waits, taken = {}, {}, true
+for i = 1, #KEYS do
+    local rate, burst, cost = tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    waits[i] = 0
+    if tokens < cost then
+        waits[i] = (cost - tokens) / rate
+        taken = false
+    end
+end
+for i = 1, #KEYS do
+    local rate, burst, cost = tonumber(ARGV[3 * i - 2]), tonumber(ARGV[3 * i - 1]), tonumber(ARGV[3 * i])
+    local tokens = levels[i]
+    if taken then tokens = tokens - cost end
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[i], math.ceil(burst / rate) + 1)
+    waits[i] = tostring(waits[i])
+end
+return waits
+"""
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every process using the same URL."""
+
+    blocking = True  # take_all() is a network round trip
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("A redis:// rate limit store needs the redis package (pip install redis)") from e
+        self._redis = redis.Redis.from_url(url)
+        self._take = self._redis.register_script(_TAKE_SCRIPT)
+
+    def take_all(self, buckets):
+        keys = [key for key, _, _, _ in buckets]
+        args = [value for _, rate, burst, cost in buckets for value in (rate, burst, cost)]
+        return [float(wait) for wait in self._take(keys=keys, args=args)]
+
+    def take(self, key, rate, burst, cost=1):
+        return self.take_all([(key, rate, burst, cost)])[0]
+
+
+def make_store(url="memory"):
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBucketStore(url)
+    if url == "memory":
+        return MemoryBucketStore()
+    raise ValueError(f"Unknown rate limit store {url!r}, expected 'memory' or a redis:// URL")
+
+
+class RateLimiter:
+    """
+    One token bucket per user and one shared by all users. Rates are tokens
+    per second; a rate of 0 disables that bucket. A cost larger than the
+    burst is capped to it, so a large batch is slowed down, never refused forever.
+    Both buckets are checked before either is charged, so a request refused
+    by one costs nothing from the other.
+    """
+
+    def __init__(self, store, user_rate=0, user_burst=1, global_rate=0, global_burst=1, prefix="ratelimit"):
+        self.store = store
+        self.user_rate = user_rate
+        self.user_burst = max(1, user_burst)
+        self.global_rate = global_rate
+        self.global_burst = max(1, global_burst)
+        self.prefix = prefix
+
+    def check(self, user=None, cost=1):
+        """Takes `cost` tokens for `user` (None: the global bucket only) or raises RequestRejected."""
+        buckets, messages = [], []
+        if user is not None and self.user_rate > 0:
+            buckets.append((f"{self.prefix}:user:{user}", self.user_rate, self.user_burst, min(cost, self.user_burst)))
+            messages.append("Rate limit exceeded")
+        if self.global_rate > 0:
+            buckets.append((f"{self.prefix}:global", self.global_rate, self.global_burst,
+                            min(cost, self.global_burst)))
+            messages.append("Server is busy, rate limit exceeded")
+        if not buckets:
+            return
+        waits = self.store.take_all(buckets)
+        for wait, message in zip(waits, messages):
+            if wait:
+                RATE_LIMITED.inc()
+                raise RequestRejected(429, message, max(waits))
+
+
+class LoadShedder:
+    """Rejects new work with 503 while `depth()` is at least `max_depth` (0 = never)."""
+
+    def __init__(self, depth, max_depth, retry_after=1.0):
+        self.depth = depth
+        self.max_depth = max_depth
+        self.retry_after = retry_after
+
+    def overloaded(self):
+        return self.max_depth > 0 and self.depth() >= self.max_depth
+
+    def check(self):
+        if self.overloaded():
+            LOAD_SHED.inc()
+            raise RequestRejected(503, "Server overloaded, try again later", self.retry_after)
@@ -1,62 +1,144 @@
 # routes.py (Backend - Flask API)
-from flask import Blueprint, request, jsonify
-from app.models import get_fact_check, save_fact_check
-import torch
-from transformers import AutoModel, BertTokenizerFast
-import torch.nn as nn
-import numpy as np
+import functools
+import json
+import time
+from flask import Blueprint, Response, g, request, jsonify, stream_with_context
+from app.models import (content_key, find_similar_fact_check, get_fact_check, get_fact_checks, load_fact_checks,
+                        save_fact_check, save_fact_checks, verdict_cache)
+from app.batching import BatchInferenceEngine
+from app.config import Config
+from app.inference import predict_fake_news_outputs, probability_fake, verdict_label
+from app.metrics import (CONTENT_TYPE, INFERENCE_WAIT_SECONDS, Counter, Gauge, merge_timings, render,
+                         server_timing_header, start_timings)
+from app.ratelimit import LoadShedder, RateLimiter, RequestRejected, make_store
+from app.singleflight import SingleFlight
+from app.trending import TrendingCounter, Warmer
+from app.worker_pool import InferenceWorkerPool
 
 api = Blueprint("api", __name__)
 
-# Load BERT model and tokenizer (do this ONCE, outside the route function)
-bert = AutoModel.from_pretrained('bert-base-uncased')
-tokenizer = BertTokenizerFast.from_pretrained('bert-base-uncased')
-
-class BERT_Arch(nn.Module):
-    def __init__(self, bert):
-        super(BERT_Arch, self).__init__()
-        self.bert = bert
-        self.dropout = nn.Dropout(0.1)
-        self.relu = nn.ReLU()
-        self.fc1 = nn.Linear(768, 512)
-        self.fc2 = nn.Linear(512, 2)  # Output layer
-
-    def forward(self, sent_id, attention_mask):
-        cls_hs = self.bert(sent_id, attention_mask=attention_mask)['pooler_output']
-        x = self.fc1(cls_hs)
-        x = self.relu(x)
-        x = self.dropout(x)
-        x = self.fc2(x)  # Output layer
-        return x
-
-model = BERT_Arch(bert)
-try:
-    path = r'D:\ClarifAI-Social_Media_Misinformation_Detection\app\c1_fakenews_weights.pt'  # Replace with your actual path
-    model.load_state_dict(torch.load(path, map_location=torch.device('cpu')), strict=False)
-    print(f"Model weights loaded from: {path}") #Confirmation message
-except FileNotFoundError:
-    print("Model weights file not found.")
-    exit()
-model.eval()
-cross_entropy = nn.CrossEntropyLoss()
-
-def predict_fake_news(text_input):
-    MAX_LENGHT = 15  # Consistent max length
-    tokens_unseen = tokenizer.batch_encode_plus(
-        [text_input],
-        max_length=MAX_LENGHT,
-        padding='max_length',
-        truncation=True,
-        return_tensors="pt"
-    )
-    unseen_seq = tokens_unseen['input_ids']
-    unseen_mask = tokens_unseen['attention_mask']
-
-    with torch.no_grad():
-        preds = model(unseen_seq, attention_mask=unseen_mask)
-        preds = preds.detach().cpu().numpy()
-    preds = np.argmax(preds, axis=1)
-    return preds[0]
+# With INFERENCE_WORKERS > 0 batches run in a pool of model processes, one
+# batch per worker at a time; otherwise in this process. Either way a batch
+# resolves to inference.Prediction tuples (label, probabilities, embedding).
+if Config.INFERENCE_WORKERS > 0:
+    worker_pool = InferenceWorkerPool(Config.INFERENCE_WORKERS, Config.INFERENCE_THREADS_PER_WORKER)
+    predict_batch = functools.partial(worker_pool.predict_batch, output="predictions",
+                                      embeddings=Config.STORE_EMBEDDINGS)
+    dispatchers = Config.INFERENCE_WORKERS
+else:
+    worker_pool = None
+    predict_batch = functools.partial(predict_fake_news_outputs, embeddings=Config.STORE_EMBEDDINGS)
+    dispatchers = 1
+
+# Concurrent requests share one forward pass through the batching engine
+inference_engine = BatchInferenceEngine(
+    predict_batch,
+    max_batch_size=Config.BATCH_MAX_SIZE,
+    max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+    dispatchers=dispatchers,
+)
+Gauge("clarifai_inference_queue_depth", "Texts waiting for the batching engine", inference_engine.queue_depth)
+if worker_pool is not None:
+    Gauge("clarifai_worker_pool_busy", "Batches being run by inference workers", worker_pool.queue_depth)
+
+# Concurrent requests for the same content share one lookup and prediction
+# (fact_check_flight), and every path shares in-flight predictions (inference_flight)
+fact_check_flight = SingleFlight()
+inference_flight = SingleFlight()
+Counter("clarifai_fact_check_coalesced_total", "Single fact checks that waited on an identical request",
+        lambda: fact_check_flight.coalesced)
+Counter("clarifai_inference_coalesced_total", "Predictions shared with an identical in-flight prediction",
+        lambda: inference_flight.coalesced)
+
+def submit_prediction(content, key=None):
+    key = key or content_key(content)
+    return inference_flight.submit(key, lambda: inference_engine.submit(content))
+
+# --- Admission control (see Config.RATE_LIMIT_* and SHED_*) ---
+rate_limiter = RateLimiter(
+    make_store(Config.RATE_LIMIT_STORE),
+    user_rate=Config.RATE_LIMIT_USER_RATE,
+    user_burst=Config.RATE_LIMIT_USER_BURST,
+    global_rate=Config.RATE_LIMIT_GLOBAL_RATE,
+    global_burst=Config.RATE_LIMIT_GLOBAL_BURST,
+)
+load_shedder = LoadShedder(inference_engine.queue_depth, Config.SHED_QUEUE_DEPTH, Config.SHED_RETRY_AFTER)
+
+def client_id(headers, address):
+    if Config.RATE_LIMIT_USER_HEADER:
+        return headers.get(Config.RATE_LIMIT_USER_HEADER) or address
+    return address
+
+@api.errorhandler(RequestRejected)
+def request_rejected(e):
+    return jsonify(e.body()), e.status, {"Retry-After": e.retry_after_header()}
+
+# --- Metrics ---
+@api.before_app_request
+def start_request_timings():
+    g.timings = start_timings()
+    g.request_start = time.perf_counter()
+
+@api.after_app_request
+def add_server_timing(response):
+    # Streamed responses send their headers before the work is done
+    if Config.SERVER_TIMING and not response.is_streamed and "timings" in g:
+        g.timings["total"] = time.perf_counter() - g.request_start
+        response.headers["Server-Timing"] = server_timing_header(g.timings)
+    return response
+
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(render(), content_type=CONTENT_TYPE)
+
+def stored_response(doc):
+    result = {"content": doc["content"], "verdict": doc["verdict"], "source": "database"}
+    if doc.get("probability_fake") is not None:  # Not stored for verdicts saved before it existed
+        result["probability_fake"] = doc["probability_fake"]
+    return result
+
+def model_response(content, prediction):
+    return {"content": content, "verdict": verdict_label(prediction), "source": "model",
+            "probability_fake": probability_fake(prediction)}
+
+def similar_response(content, similar_result):
+    return {
+        "content": content,
+        "verdict": similar_result["verdict"],
+        "source": "similar",
+        "matched_content": similar_result["content"],
+        "similarity": round(similar_result["similarity"], 3),
+    }
+
+def predict(content):
+    start = time.perf_counter()
+    future = submit_prediction(content)
+    try:
+        return future.result()
+    finally:
+        INFERENCE_WAIT_SECONDS.observe(time.perf_counter() - start)
+        merge_timings(getattr(future, "timings", None))
+
+def resolve_fact_check(content):
+    """Stored verdict, near-duplicate match or new prediction for one content, as the response body."""
+    existing_result = get_fact_check(content)
+    if existing_result:
+        return stored_response(existing_result)
+
+    similar_result = find_similar_fact_check(content)
+    if similar_result:
+        return similar_response(content, similar_result)
+
+    load_shedder.check()  # Only requests that need the model are shed
+    prediction = predict(content)
+    save_fact_check(content, verdict_label(prediction), prediction)  # This will now handle duplicates
+    return model_response(content, prediction)
+
+def for_caller(result, content):
+    # A coalesced result may come from a request that spelled the content differently
+    if result["source"] == "database" or result["content"] == content:
+        return result
+    return {**result, "content": content}
 
 @api.route("/api/fact-check", methods=["POST"])
 def check_misinformation():
@@ -66,21 +148,152 @@ def check_misinformation():
     if not content:
         return jsonify({"error": "Content is required"}), 400
 
-    existing_result = get_fact_check(content)
-    if existing_result:
-        return jsonify({
-            "content": existing_result["content"],
-            "verdict": existing_result["verdict"],
-            "source": "database"
-        }), 200
+    rate_limiter.check(client_id(request.headers, request.remote_addr))
+    key = content_key(content)
+    record_request(key, content)
+    result = fact_check_flight.do(key, lambda: resolve_fact_check(content))
+    return jsonify(for_caller(result, content)), 200
 
-    prediction = predict_fake_news(content)
-    verdict = "Fake" if prediction == 1 else "True"
+@api.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(verdict_cache.stats()), 200
 
-    save_fact_check(content, verdict)  # This will now handle duplicates
+# --- Batch endpoint ---
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/jsonl")
 
-    return jsonify({
-        "content": content,
-        "verdict": verdict,
-        "source": "model"
-    }), 200
\ No newline at end of file
+def parse_ndjson_line(line):
+    """An NDJSON line holds a JSON string or {"content": ...}. Invalid lines give None."""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return None  # Reported back as an error for that line
+    return item.get("content") if isinstance(item, dict) else item
+
+def iter_ndjson_contents(stream):
+    """Yields one content per non-empty NDJSON line."""
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield parse_ndjson_line(line)
+
+def iter_chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def is_valid_content(content):
+    return isinstance(content, str) and bool(content.strip())
+
+def collect_misses(contents, stored):
+    """
+    Splits contents not in `stored` into near-duplicates of stored claims and
+    real misses. Returns ({content_key: similar result}, {content_key: content}).
+    """
+    similar, misses = {}, {}
+    for content in contents:
+        key = content_key(content)
+        if key in stored or key in similar or key in misses:
+            continue
+        similar_result = find_similar_fact_check(content)
+        if similar_result:
+            similar[key] = similar_result
+        else:
+            misses[key] = content
+    return similar, misses
+
+def chunk_results(contents, stored, similar, predicted):
+    """Builds one result per input, in input order, from stored, similar and predicted results."""
+    results = []
+    for content in contents:
+        if not is_valid_content(content):
+            results.append({"error": "Content is required"})
+            continue
+        key = content_key(content)
+        if key in stored:
+            results.append({**stored_response(stored[key]), "content": content})
+        elif key in similar:
+            results.append(similar_response(content, similar[key]))
+        else:
+            results.append(model_response(content, predicted[key]))
+    return results
+
+def fact_check_chunk(contents):
+    """Resolves one chunk: one $in lookup, batched inference for misses, one insert."""
+    valid = [c for c in contents if is_valid_content(c)]
+    for content in valid:
+        record_request(content_key(content), content)
+    stored = get_fact_checks(valid)
+    similar, misses = collect_misses(valid, stored)
+    start = time.perf_counter()
+    futures = {key: submit_prediction(content, key) for key, content in misses.items()}
+    predicted = {key: future.result() for key, future in futures.items()}
+    if futures:
+        INFERENCE_WAIT_SECONDS.observe(time.perf_counter() - start)
+        for timings in {id(f.timings): f.timings for f in futures.values()}.values():  # Once per batch
+            merge_timings(timings)
+    save_fact_checks([(misses[key], verdict_label(p), p) for key, p in predicted.items()])
+    return chunk_results(contents, stored, similar, predicted)
+
+# --- Trending claims ---
+trending = TrendingCounter(Config.TRENDING_WINDOW, max_keys=Config.TRENDING_MAX_KEYS)
+
+def warm_trending():
+    """
+    Refreshes the most requested recent claims whose cached verdict is
+    missing or about to expire: stored verdicts are re-read from Mongo in one
+    query, claims without one are scored and saved. Returns how many
+    claims were refreshed.
+    """
+    due = []
+    for key, content, _ in trending.top(Config.WARMER_TOP_N):
+        remaining = verdict_cache.ttl_remaining(key)
+        if remaining is None or remaining <= Config.WARMER_REFRESH_AHEAD:
+            due.append(content)
+    if not due or load_shedder.overloaded():
+        return 0  # Nothing to do, or no spare capacity: live requests come first
+    stored = load_fact_checks(due)
+    similar, misses = collect_misses(due, stored)  # Near-duplicates are answered from memory anyway
+    futures = {key: submit_prediction(content, key) for key, content in misses.items()}
+    predicted = {key: future.result() for key, future in futures.items()}
+    save_fact_checks([(misses[key], verdict_label(p), p) for key, p in predicted.items()])
+    return len(stored) + len(futures)
+
+warmer = Warmer(warm_trending, Config.WARMER_INTERVAL, name="trending-warmer")
+Gauge("clarifai_trending_claims", "Distinct claims counted in the trending window", lambda: len(trending))
+Counter("clarifai_warmed_claims_total", "Trending claims refreshed ahead of demand", lambda: warmer.warmed)
+
+def record_request(key, content):
+    trending.record(key, content)
+    warmer.start()
+
+def batch_cost(contents):
+    # The length of an NDJSON stream is unknown until it is read
+    return len(contents) if isinstance(contents, list) else Config.BATCH_CHUNK_SIZE
+
+@api.route("/api/fact-check/batch", methods=["POST"])
+def check_misinformation_batch():
+    # Either an NDJSON stream, read lazily, or a JSON list / {"contents": [...]}
+    if request.mimetype in NDJSON_MIMETYPES:
+        contents = iter_ndjson_contents(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        contents = data.get("contents") if isinstance(data, dict) else data
+        if not isinstance(contents, list):
+            return jsonify({"error": "Expected a list of contents or an NDJSON stream"}), 400
+    # Admitted before the response starts: a streamed response cannot change its status later
+    rate_limiter.check(client_id(request.headers, request.remote_addr), batch_cost(contents))
+    load_shedder.check()
+
+    def generate():
+        index = 0
+        for chunk in iter_chunks(contents, Config.BATCH_CHUNK_SIZE):
+            for result in fact_check_chunk(chunk):
+                yield json.dumps({"index": index, **result}) + "\n"
+                index += 1
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
@@ -0,0 +1,72 @@
+# sessions.py - Signed session tokens and password hashing for the Streamlit UI
+#
+# The session cookie holds "<payload>.<signature>": the payload is the user's
+# email, display name and expiry as base64url JSON, the signature an
+# HMAC-SHA256 of the payload with the server's secret. Verifying a session
+# costs one HMAC and no database lookup, and a cookie edited in the browser
+# fails verification (unlike the plain username/user_email cookies it replaces).
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import time
+
+import bcrypt
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _sign(payload, secret):
+    return _b64encode(hmac.new(secret.encode("utf-8"), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def generate_secret():
+    return secrets.token_urlsafe(32)
+
+
+def issue_token(email, username, secret, ttl):
+    """A session token for `email`, valid for `ttl` seconds."""
+    session = {"email": email, "username": username, "exp": int(time.time() + ttl)}
+    payload = _b64encode(json.dumps(session, separators=(",", ":")).encode("utf-8"))
+    return f"{payload}.{_sign(payload, secret)}"
+
+
+def verify_token(token, secret):
+    """Returns the session ({"email", "username", "exp"}) if `token` is authentic and unexpired, else None."""
+    if not token:
+        return None
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(signature, _sign(payload, secret)):
+            return None
+        session = json.loads(_b64decode(payload))
+    except (ValueError, TypeError):  # Malformed, or not ASCII
+        return None
+    if not isinstance(session, dict) or session.get("exp", 0) <= time.time():
+        return None
+    return session
+
+
+# --- Passwords ---
+def hash_password(password, rounds=12):
+    # Each extra round doubles the time of hashing and of every later check
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds))
+
+
+def verify_password(stored_password, password):
+    return bcrypt.checkpw(password.encode("utf-8"), stored_password)
+
+
+def hash_rounds(stored_password):
+    """The cost factor of a bcrypt hash ("$2b$12$..." -> 12), or None if it cannot be read."""
+    try:
+        return int(stored_password.split(b"$")[2])
+    except (IndexError, ValueError):
+        return None
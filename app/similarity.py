@@ -0,0 +1,286 @@
+# similarity.py - MinHash/LSH index of stored claims for near-duplicate lookups
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from datetime import timedelta
+
+import numpy as np
+from bson import ObjectId
+
+URL_RE = re.compile(r"https?://\S+|www\.\S+")
+MENTION_RE = re.compile(r"(?:^|\s)(?:rt\s+)?@\w+:?")
+NON_WORD_RE = re.compile(r"[^\w]+|_")
+
+MERSENNE_PRIME = (1 << 31) - 1
+FNV_OFFSET = np.uint64(0xCBF29CE484222325)
+FNV_PRIME = np.uint64(0x100000001B3)
+RECENT_CLAIMS = 4096  # Claims added before merging into the sorted band arrays, at least
+MERGE_CHUNK = 1 << 16
+# ObjectIds made by different processes are only ordered to the second, and a
+# write-behind batch may land a while after its ids were made: a refresh reads
+# back this many seconds before the newest claim already seen
+REFRESH_OVERLAP = 60
+
+
+def normalize_claim(text):
+    """
+    Reduces a post to the words that carry the claim: case, URLs, @mentions,
+    retweet prefixes, hashtag marks, emoji and punctuation are dropped.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = URL_RE.sub(" ", text)
+    text = MENTION_RE.sub(" ", text)
+    return " ".join(NON_WORD_RE.sub(" ", text).split())
+
+
+def shingles(text, k=5):
+    """Character k-grams of the normalized text, hashed to stable 32-bit ints."""
+    text = normalize_claim(text)
+    if len(text) <= k:
+        return {zlib.crc32(text.encode())} if text else set()
+    return {zlib.crc32(text[i:i + k].encode()) for i in range(len(text) - k + 1)}
+
+
+class SimilarClaimIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures. A claim's signature
+    is `bands` x `rows` minimum hash values; two claims land in the same
+    bucket of at least one band with high probability when their shingle
+    Jaccard similarity is above roughly (1 / bands) ** (1 / rows). Bucket
+    candidates are then checked against `threshold` using the signatures.
+
+    Storage is compact, about 400 bytes per claim plus its text: signatures
+    live in one array (the low 16 bits of each value, plenty to compare
+    them), and the band buckets are one sorted array of 64-bit band keys
+    with the matching claim slots. Recently added claims are kept in a
+    small dict until they are merged into the sorted arrays. A lookup is
+    one binary search per band, then one vectorized comparison of the
+    candidates. At most `max_claims` claims are held; beyond that the
+    oldest are replaced.
+
+    Each process holds its own index. Claims it saves are added right away;
+    claims saved by other processes are picked up by refresh(), so until the
+    next refresh a near-duplicate of one may be missed.
+    """
+
+    def __init__(self, threshold=0.8, bands=16, rows=4, seed=42, max_claims=500000):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = rows
+        self.num_perm = bands * rows
+        self.max_claims = max(1, int(max_claims))
+        rng = np.random.default_rng(seed)  # Fixed seed: signatures are persisted
+        self._a = rng.integers(1, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        # The band number is kept in the low bits of each band key
+        self._band_bits = max(1, (bands - 1).bit_length())
+        self._band_ids = np.arange(bands, dtype=np.uint64)
+        self._lock = threading.Lock()
+        self._loader = None
+        self._reset()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset(self):
+        self._signatures = np.empty((0, self.num_perm), dtype=np.uint16)  # slot -> compact signature
+        self._contents = []  # slot -> content
+        self._verdicts = []  # slot -> verdict
+        self._added = 0  # Claims ever added; the next one goes to slot _added % max_claims
+        self._sorted = (np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.uint32))  # (band keys, slots)
+        self._recent = {}  # band key -> [slots], not merged yet
+        self._recent_claims = 0
+        self._newest = None  # Generation time of the newest stored claim read
+        self._seen = {}  # _id -> generation time of claims read within REFRESH_OVERLAP of _newest
+        self.loaded = False
+
+    def _after_fork(self):
+        # A fork copies the index but not the loader thread, and may copy the
+        # lock while that thread held it: the child starts over with a fresh
+        # lock and, unless the copy was complete, loads the index itself
+        self._lock = threading.Lock()
+        if not self.loaded:
+            self._reset()
+        self._loader = None  # A loaded copy still needs its own refresh thread
+
+    def __len__(self):
+        return min(self._added, self.max_claims)
+
+    def signature(self, text):
+        hashes = np.fromiter(shingles(text), dtype=np.uint64)
+        if hashes.size == 0:
+            return None
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _keys(self, rows, bands):
+        # FNV-1a over the rows of a band (uint64 arithmetic wraps), band number in the low bits
+        rows = rows.astype(np.uint64)
+        keys = np.full(len(rows), FNV_OFFSET, dtype=np.uint64)
+        for row in range(self.rows):
+            keys = (keys ^ rows[:, row]) * FNV_PRIME
+        return (keys << np.uint64(self._band_bits)) | bands
+
+    def _band_keys(self, compact):
+        return self._keys(compact.reshape(self.bands, self.rows), self._band_ids)
+
+    def _grow(self, size):
+        # Capacity grows by half, up to max_claims
+        capacity = min(self.max_claims, max(1024, len(self._signatures) * 3 // 2, size))
+        signatures = np.empty((capacity, self.num_perm), dtype=np.uint16)
+        signatures[:len(self._signatures)] = self._signatures
+        self._signatures = signatures
+
+    def add(self, content, verdict, signature=None):
+        if signature is None:
+            signature = self.signature(content)
+        if signature is None:
+            return
+        compact = signature.astype(np.uint16)
+        keys = self._band_keys(compact)
+        with self._lock:
+            slot = self._added % self.max_claims
+            if slot >= len(self._signatures):
+                self._grow(slot + 1)
+            self._signatures[slot] = compact
+            if slot < len(self._contents):
+                self._contents[slot] = content
+                self._verdicts[slot] = verdict
+            else:
+                self._contents.append(content)
+                self._verdicts.append(verdict)
+            self._added += 1
+            for key in keys.tolist():
+                self._recent.setdefault(key, []).append(slot)
+            self._recent_claims += 1
+            if self._recent_claims >= max(RECENT_CLAIMS, len(self) // 16):
+                self._merge()
+
+    def _merge(self):
+        # Called with the lock held. Merged arrays are published before the
+        # recent dict is emptied, and lookups read the dict first, so a
+        # concurrent lookup always sees every claim in one or the other.
+        keys, slots = self._sorted
+        count = sum(len(v) for v in self._recent.values())
+        new_keys = np.fromiter((k for k, v in self._recent.items() for _ in v), dtype=np.uint64, count=count)
+        new_slots = np.fromiter((s for v in self._recent.values() for s in v), dtype=np.uint32, count=count)
+        order = np.argsort(new_keys, kind="stable")
+        keys = np.concatenate([keys, new_keys[order]])
+        slots = np.concatenate([slots, new_slots[order]])
+        if self._added > self.max_claims:
+            # Drop the buckets of claims whose slot has since been reused: their
+            # key no longer matches the band of the signature now in the slot
+            current = np.empty(len(keys), dtype=bool)
+            for i in range(0, len(keys), MERGE_CHUNK):
+                chunk_keys, chunk_slots = keys[i:i + MERGE_CHUNK], slots[i:i + MERGE_CHUNK]
+                bands = chunk_keys & np.uint64((1 << self._band_bits) - 1)
+                rows = self._signatures[chunk_slots].reshape(-1, self.bands, self.rows)
+                rows = rows[np.arange(len(chunk_slots)), bands.astype(np.intp)]
+                current[i:i + MERGE_CHUNK] = self._keys(rows, bands) == chunk_keys
+            keys, slots = keys[current], slots[current]
+        # Two sorted runs: the stable sort merges them in linear time
+        order = np.argsort(keys, kind="stable")
+        self._sorted = (keys[order], slots[order])
+        self._recent = {}
+        self._recent_claims = 0
+
+    def lookup(self, text):
+        """Returns (content, verdict, similarity) of the closest claim above threshold, or None."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        compact = signature.astype(np.uint16)
+        band_keys = self._band_keys(compact)
+        recent = self._recent  # Read before _sorted, see _merge
+        keys, slots = self._sorted
+        # One search for the start of each key's run and the start of the next key's
+        bounds = np.searchsorted(keys, np.concatenate([band_keys, band_keys + np.uint64(1)])).tolist()
+        found = [slots[start:end] for start, end in zip(bounds[:self.bands], bounds[self.bands:]) if end > start]
+        for key in band_keys.tolist():
+            if key in recent:
+                found.append(np.array(recent[key], dtype=np.uint32))
+        if not found:
+            return None
+        candidates = np.unique(np.concatenate(found))
+        matches = np.count_nonzero(self._signatures[candidates] == compact, axis=1)
+        best = int(matches.argmax())
+        best_similarity = int(matches[best]) / self.num_perm
+        if best_similarity < self.threshold:
+            return None
+        slot = int(candidates[best])
+        return self._contents[slot], self._verdicts[slot], best_similarity
+
+    def load(self, collection, batch_size=10000):
+        """Builds the index from the newest `max_claims` stored claims, reusing persisted signatures."""
+        skip = max(0, collection.estimated_document_count() - self.max_claims)
+        cursor = collection.find({}, {"content": 1, "verdict": 1, "minhash": 1},
+                                 batch_size=batch_size).sort("_id", 1).skip(skip)
+        for doc in cursor:
+            self._add_stored(doc)
+        self.loaded = True
+        print(f"Similarity index loaded with {len(self)} claims")
+
+    def refresh(self, collection, batch_size=10000):
+        """
+        Adds the claims stored since the load or the last refresh, such as
+        those saved by other worker processes. Claims already read, or
+        already held verbatim because this process saved them, are skipped.
+        Returns the number added.
+        """
+        if self._newest is None:
+            query = {}
+        else:
+            query = {"_id": {"$gte": ObjectId.from_datetime(self._newest - timedelta(seconds=REFRESH_OVERLAP))}}
+        cursor = collection.find(query, {"content": 1, "verdict": 1, "minhash": 1},
+                                 batch_size=batch_size).sort("_id", 1)
+        added = 0
+        for doc in cursor:
+            if doc["_id"] in self._seen:
+                continue
+            match = self.lookup(doc["content"])
+            if match is None or match[0] != doc["content"]:
+                self._add_stored(doc)
+                added += 1
+            if isinstance(doc["_id"], ObjectId):
+                self._seen[doc["_id"]] = doc["_id"].generation_time
+        if self._newest is not None:
+            oldest = self._newest - timedelta(seconds=REFRESH_OVERLAP)
+            self._seen = {_id: generated for _id, generated in self._seen.items() if generated >= oldest}
+        return added
+
+    def _add_stored(self, doc):
+        minhash = doc.get("minhash")
+        signature = np.frombuffer(minhash, dtype=np.uint32) if minhash else None
+        self.add(doc["content"], doc["verdict"], signature)
+        if isinstance(doc["_id"], ObjectId) and (self._newest is None or doc["_id"].generation_time > self._newest):
+            self._newest = doc["_id"].generation_time
+
+    def start_loading(self, get_collection, refresh_interval=0):
+        """
+        Loads the index from `get_collection()` on a background thread, once
+        per process, then refreshes it every `refresh_interval` seconds (0 =
+        never). Called on first lookup rather than at import, so a gunicorn
+        master (preload_app) does not start a load that its forked workers
+        would inherit half-built.
+        """
+        if self._loader is not None:
+            return
+        with self._lock:
+            if self._loader is None:
+                self._loader = threading.Thread(target=self._load_and_refresh, args=(get_collection, refresh_interval),
+                                                name="similarity-index-load", daemon=True)
+                self._loader.start()
+
+    def _load_and_refresh(self, get_collection, refresh_interval):
+        if not self.loaded:
+            self.load(get_collection())
+        while refresh_interval > 0:
+            time.sleep(refresh_interval)
+            try:
+                added = self.refresh(get_collection())
+                if added:
+                    print(f"Similarity index refreshed with {added} claims")
+            except Exception as e:
+                print(f"Error refreshing the similarity index: {e}")
@@ -0,0 +1,91 @@
+# singleflight.py - Coalescing of concurrent identical work
+#
+# When a claim starts trending, hundreds of requests for the same content
+# arrive before its verdict is cached. With a SingleFlight keyed by content,
+# the first request does the lookup and prediction and the others wait for
+# its result instead of repeating them.
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Concurrent calls for the same key share one execution: the first caller
+    (the leader) runs the work and the others wait for its result or
+    exception. The key is forgotten as soon as the work finishes, so only
+    overlapping calls are collapsed; caching results is left to the caller.
+    `coalesced` counts the calls that did not run the work themselves.
+    """
+
+    def __init__(self):
+        self._calls = {}  # key -> Future of the running call
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def _join(self, key):
+        """Returns (future, leader)."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            return future, True
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def do(self, key, fn):
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except Exception as e:
+            self._forget(key, future)
+            future.set_exception(e)
+            raise
+        self._forget(key, future)
+        future.set_result(result)
+        return result
+
+    async def do_async(self, key, fn):
+        """do() for a coroutine function. Shares keys with do() and submit()."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        try:
+            result = await fn()
+        except Exception as e:
+            self._forget(key, future)
+            future.set_exception(e)
+            raise
+        self._forget(key, future)
+        future.set_result(result)
+        return result
+
+    def submit(self, key, start):
+        """
+        For work that already runs elsewhere and returns a Future (e.g.
+        BatchInferenceEngine.submit): returns the in-flight Future for `key`,
+        or calls start() and returns its Future.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = start()
+            self._calls[key] = future
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def running(self, key):
+        return key in self._calls
+
+    def in_flight(self):
+        return len(self._calls)
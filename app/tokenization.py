@@ -0,0 +1,66 @@
+# tokenization.py - Cached, length-aware tokenization for predict_fake_news
+import torch
+
+from app.cache import LRUCache
+from app.config import Config
+from app.metrics import TOKENIZATION_SECONDS, Counter, Gauge
+from app.model_registry import get_tokenizer
+
+# Token ids of recently seen texts, so repeated content skips the tokenizer
+token_cache = LRUCache(Config.TOKEN_CACHE_SIZE)
+Counter("clarifai_token_cache_hits_total", "Token cache hits", lambda: token_cache.stats()["hits"])
+Counter("clarifai_token_cache_misses_total", "Token cache misses", lambda: token_cache.stats()["misses"])
+Gauge("clarifai_token_cache_hit_ratio", "Token cache hit ratio", lambda: token_cache.stats()["hit_ratio"])
+
+
+def encode(texts, max_length=None):
+    """
+    Returns one list of token ids per text, truncated to max_length and
+    without padding. Cache misses are tokenized together in one call.
+    """
+    max_length = max_length or Config.MODEL_MAX_LENGTH
+    with TOKENIZATION_SECONDS.time():
+        encoded = [token_cache.get((max_length, text)) for text in texts]
+        misses = sorted({text for text, ids in zip(texts, encoded) if ids is None})
+        if misses:
+            tokens = get_tokenizer().batch_encode_plus(
+                misses,
+                max_length=max_length,
+                padding=False,
+                truncation=True,
+            )
+            fresh = dict(zip(misses, tokens["input_ids"]))
+            for text, ids in fresh.items():
+                token_cache.set((max_length, text), ids)
+            encoded = [ids if ids is not None else fresh[text] for text, ids in zip(texts, encoded)]
+    return encoded
+
+
+def pad(sequences, pad_token_id=0):
+    """Pads to the longest sequence in the group (not to max_length)."""
+    longest = max(len(ids) for ids in sequences)
+    input_ids = torch.full((len(sequences), longest), pad_token_id, dtype=torch.long)
+    attention_mask = torch.zeros((len(sequences), longest), dtype=torch.long)
+    for row, ids in enumerate(sequences):
+        input_ids[row, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+        attention_mask[row, :len(ids)] = 1
+    return input_ids, attention_mask
+
+
+def bucketed_batches(sequences, buckets=None, pad_token_id=None):
+    """
+    Groups sequences by length bucket so short posts are not padded to the
+    length of long ones. Yields (indices, input_ids, attention_mask) per
+    bucket, where indices are positions in `sequences`.
+    """
+    buckets = buckets or Config.TOKEN_LENGTH_BUCKETS
+    groups = {}
+    for i, ids in enumerate(sequences):
+        bucket = next((b for b in buckets if len(ids) <= b), len(ids))
+        groups.setdefault(bucket, []).append(i)
+    if pad_token_id is None:
+        pad_token_id = get_tokenizer().pad_token_id or 0
+    for bucket in sorted(groups):
+        indices = groups[bucket]
+        input_ids, attention_mask = pad([sequences[i] for i in indices], pad_token_id)
+        yield indices, input_ids, attention_mask
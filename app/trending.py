@@ -0,0 +1,96 @@
+# trending.py - Request counts of recent claims and a background cache warmer
+#
+# TrendingCounter counts requests per key over a sliding window, in one
+# Counter per time slot, so old traffic drops out a slot at a time. A Warmer
+# periodically takes the top keys and refreshes their cached results before
+# they expire, so a claim that is being hammered never misses the cache.
+import threading
+import time
+from collections import Counter, deque
+
+
+class TrendingCounter:
+    """
+    Request counts per key over the last `window` seconds, split into
+    `slots` time slots. Each slot tracks at most `max_keys` distinct keys:
+    under a flood of unique content, new keys are not counted until the next
+    slot, which keeps memory bounded without losing the keys that repeat.
+    """
+
+    def __init__(self, window=600, slots=10, max_keys=10000):
+        self.slot_seconds = max(1.0, window / max(1, slots))
+        self.slots = max(1, slots)
+        self.max_keys = max_keys
+        self._buckets = deque()  # (slot number, Counter)
+        self._values = {}        # key -> latest value recorded for it (e.g. the original content)
+        self._lock = threading.Lock()
+
+    def _current(self, now):
+        slot = int(now // self.slot_seconds)
+        if not self._buckets or self._buckets[-1][0] != slot:
+            self._buckets.append((slot, Counter()))
+            expired = False
+            while self._buckets[0][0] <= slot - self.slots:
+                self._buckets.popleft()
+                expired = True
+            if expired:
+                live = set().union(*(counts.keys() for _, counts in self._buckets))
+                self._values = {key: value for key, value in self._values.items() if key in live}
+        return self._buckets[-1][1]
+
+    def record(self, key, value=None):
+        with self._lock:
+            counts = self._current(time.time())
+            if key in counts or len(counts) < self.max_keys:
+                counts[key] += 1
+                self._values[key] = value if value is not None else key
+
+    def top(self, n):
+        """The n most requested keys in the window, as [(key, value, count)]."""
+        with self._lock:
+            self._current(time.time())
+            total = Counter()
+            for _, counts in self._buckets:
+                total.update(counts)
+            return [(key, self._values[key], count) for key, count in total.most_common(n)]
+
+    def __len__(self):
+        return len(self._values)
+
+
+class Warmer:
+    """
+    Calls `warm()` every `interval` seconds on a daemon thread, started on
+    first use so that importing a module does not spawn threads (and a
+    gunicorn master does not start one before forking). warm() returns how
+    many entries it refreshed; the running total is kept in `warmed`.
+    """
+
+    def __init__(self, warm, interval, name="warmer"):
+        self.warm = warm
+        self.interval = interval
+        self.name = name
+        self.warmed = 0
+        self.runs = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def run_once(self):
+        try:
+            self.warmed += self.warm() or 0
+        except Exception as e:
+            print(f"{self.name}: warming failed: {e}")
+        self.runs += 1
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self.run_once()
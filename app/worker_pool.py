@@ -0,0 +1,236 @@
+# worker_pool.py - Multi-process BERT_Arch inference with shared-memory weights
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from multiprocessing.connection import wait
+
+import torch
+import torch.multiprocessing as mp
+
+from app.config import Config
+from app.metrics import MODEL_FORWARD_SECONDS
+from app.tokenization import encode
+
+
+class WorkerCrashedError(RuntimeError):
+    pass
+
+
+def _worker_main(index, model, backend, num_threads, tasks, results):
+    """
+    Body of worker `index`. `model` arrives as fp32 tensors in shared
+    memory, so every worker maps the same weights instead of holding a copy.
+    """
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    from app.inference import predict_outputs
+    from app.model_registry import apply_backend, get_tokenizer
+    if backend != "fp32":
+        # int8/torchscript build their own (smaller or frozen) weights per worker
+        model = apply_backend(model, backend, get_tokenizer())
+    results.send((None, None, None, 0.0))  # No job: this worker is ready for batches
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, sequences, pad_token_id, output, embeddings = task
+        start = time.perf_counter()
+        try:
+            preds = predict_outputs(model, sequences, pad_token_id, embeddings=embeddings)
+            # Only what the caller asked for goes back through the results pipe
+            if output == "labels":
+                preds = [p.label for p in preds]
+            elif output == "probabilities":
+                preds = [p.probabilities for p in preds]
+            results.send((job_id, preds, None, time.perf_counter() - start))
+        except Exception as e:
+            results.send((job_id, None, repr(e), time.perf_counter() - start))
+
+
+class InferenceWorkerPool:
+    """
+    Runs predictions in `num_workers` processes, each pinned to
+    `threads_per_worker` torch threads so they do not contend for cores.
+    Texts are tokenized (and cached) in the calling process; workers only pad
+    and run the forward pass. Each worker holds one batch at a time, so when a
+    worker dies we know which batch to fail before restarting it. A worker
+    that does not answer within `timeout` seconds is killed and restarted,
+    and its batch fails. Every worker answers on its own pipe, replaced on
+    restart, so a worker killed halfway through a write cannot block the
+    others.
+    """
+
+    def __init__(self, num_workers, threads_per_worker=1, backend=None, timeout=None):
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self.backend = backend or Config.INFERENCE_BACKEND
+        self.timeout = timeout or Config.INFERENCE_WORKER_TIMEOUT
+        self._ctx = mp.get_context("spawn")  # No fork: the web process already runs threads
+        self._lock = threading.Lock()
+        self._started = False
+        self._closing = False
+        self._job_ids = itertools.count()
+        # Guards _idle, _assigned, _processes, _task_queues and _result_pipes: a batch is
+        # assigned and put on a worker's queue in one step, so the supervisor
+        # never swaps a queue between the two
+        self._slots = threading.Condition()
+        self._idle = []             # Indices of workers free to take a batch
+        self._ready = set()         # Indices of workers done starting up
+        self._assigned = {}         # job_id -> (worker index, Future)
+        self._processes = []
+        self._task_queues = []
+        self._result_pipes = []     # Read end of each worker's results pipe
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            from app.model_registry import build_model, get_tokenizer
+            self._pad_token_id = get_tokenizer().pad_token_id or 0
+            self._model = build_model()
+            self._model.share_memory()
+            with self._slots:
+                for i in range(self.num_workers):
+                    self._task_queues.append(self._ctx.Queue())
+                    self._result_pipes.append(None)
+                    self._processes.append(self._spawn(i))
+                    self._idle.append(i)
+            threading.Thread(target=self._collect_results, name="worker-pool-results", daemon=True).start()
+            threading.Thread(target=self._supervise, name="worker-pool-supervisor", daemon=True).start()
+            self._started = True
+            print(f"Started {self.num_workers} inference workers x {self.threads_per_worker} threads ({self.backend})")
+
+    def _spawn(self, index):
+        # Called with _slots held (or before the pool is shared)
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self._model, self.backend, self.threads_per_worker, self._task_queues[index], writer),
+            daemon=True,
+        )
+        process.start()
+        writer.close()  # Only the worker holds the write end, so its death shows up as EOF
+        self._result_pipes[index] = reader
+        return process
+
+    def queue_depth(self):
+        return len(self._assigned)
+
+    def predict_batch(self, texts, max_length=None, output="labels", embeddings=False):
+        """
+        Blocks until a worker is free, then until it returns the batch's
+        predictions: class labels, class probabilities (output="probabilities")
+        or inference.Prediction tuples (output="predictions", with pooled
+        embeddings if `embeddings`).
+        """
+        self.start()
+        sequences = encode(list(texts), max_length)
+        job_id = next(self._job_ids)
+        future = Future()
+        with self._slots:
+            index = self._take_idle(time.monotonic() + self.timeout)
+            self._assigned[job_id] = (index, future)
+            self._task_queues[index].put((job_id, sequences, self._pad_token_id, output, embeddings))
+        try:
+            preds = future.result(timeout=self.timeout)
+        except TimeoutError:
+            self._abandon(job_id)
+            if future.done():  # Answered just in time
+                preds = future.result()
+            else:
+                raise WorkerCrashedError(f"Inference worker did not answer within {self.timeout:g}s")
+        MODEL_FORWARD_SECONDS.observe(future.forward_seconds)  # Measured in the worker
+        return preds
+
+    def _take_idle(self, deadline):
+        # Called with _slots held. A worker still starting up, or one that died
+        # while idle, is skipped until it is ready (again)
+        while True:
+            for index in self._idle:
+                if index in self._ready and self._processes[index].is_alive():
+                    self._idle.remove(index)
+                    return index
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise WorkerCrashedError(f"No inference worker became free within {self.timeout:g}s")
+            self._slots.wait(min(remaining, 0.5))
+
+    def _finish(self, job_id):
+        with self._slots:
+            index, future = self._assigned.pop(job_id, (None, None))
+            if index is not None:
+                self._idle.append(index)
+                self._slots.notify()
+        return future
+
+    def _abandon(self, job_id):
+        # The worker holding `job_id` is hung: kill it, the supervisor restarts it
+        with self._slots:
+            index, _ = self._assigned.pop(job_id, (None, None))
+            if index is not None:
+                process = self._processes[index]
+                print(f"Inference worker {process.pid} did not answer within {self.timeout:g}s, killing it")
+                process.kill()
+
+    def _collect_results(self):
+        closed = set()  # Pipes at EOF, until the supervisor replaces them
+        while not self._closing:
+            with self._slots:
+                pipes = {pipe: index for index, pipe in enumerate(self._result_pipes) if pipe not in closed}
+            closed &= set(self._result_pipes)
+            for pipe in wait(list(pipes), timeout=0.5):
+                try:
+                    message = pipe.recv()
+                except (EOFError, OSError):
+                    closed.add(pipe)  # The worker died; the supervisor restarts it with a new pipe
+                    continue
+                self._handle_result(pipes[pipe], pipe, message)
+
+    def _handle_result(self, index, pipe, message):
+        job_id, preds, error, forward_seconds = message
+        with self._slots:
+            if self._result_pipes[index] is not pipe:
+                return  # From a worker already replaced; its batch has been failed
+            if job_id is None:
+                self._ready.add(index)
+                self._slots.notify_all()
+                return
+        future = self._finish(job_id)
+        if future is None:
+            return  # Already failed by the supervisor
+        future.forward_seconds = forward_seconds
+        if error is None:
+            future.set_result(preds)
+        else:
+            future.set_exception(RuntimeError(f"Inference worker failed: {error}"))
+
+    def _supervise(self):
+        while not self._closing:
+            time.sleep(0.5)
+            for index in range(self.num_workers):
+                lost = []
+                with self._slots:
+                    process = self._processes[index]
+                    if process.is_alive() or self._closing:
+                        continue
+                    print(f"Inference worker {process.pid} exited with code {process.exitcode}, restarting")
+                    lost = [self._assigned.pop(job_id)[1] for job_id, (i, _) in list(self._assigned.items())
+                            if i == index]
+                    self._task_queues[index] = self._ctx.Queue()  # Drop anything the dead worker did not read
+                    # _spawn also gives it a new results pipe; the old one is dropped unread
+                    self._ready.discard(index)
+                    self._processes[index] = self._spawn(index)
+                    if index not in self._idle:
+                        self._idle.append(index)
+                    self._slots.notify()
+                for future in lost:
+                    future.set_exception(WorkerCrashedError(f"Inference worker {process.pid} crashed"))
+
+    def close(self, timeout=5):
+        self._closing = True
+        for tasks in self._task_queues:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
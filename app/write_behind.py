@@ -0,0 +1,114 @@
+# write_behind.py - Buffered, batched persistence of new verdicts
+import atexit
+import queue
+import threading
+import time
+
+
+class WriteBehindBuffer:
+    """
+    Takes Mongo writes off the request path. Documents are queued and a
+    background thread hands them to `write_many` in batches, once
+    `max_batch_size` are waiting or `flush_interval` seconds have passed.
+
+    The queue holds at most `max_pending` documents. When Mongo is slow and
+    the queue fills, add() blocks the caller for up to `put_timeout` seconds
+    (backpressure) and then returns False so the caller can write directly.
+    Failed batches are retried with backoff; everything still queued is
+    flushed at interpreter exit.
+    """
+
+    def __init__(self, write_many, max_batch_size=500, flush_interval=1.0, max_pending=10000,
+                 put_timeout=2.0, max_retries=3):
+        self.write_many = write_many
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._write_lock = threading.Lock()  # One batch written at a time
+        self._start_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def start(self):
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+
+    def add(self, doc):
+        if self._closed:
+            return False
+        self.start()
+        try:
+            self._queue.put(doc, timeout=self.put_timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def add_many(self, docs):
+        """Queues docs in order; returns the ones that did not fit."""
+        for i, doc in enumerate(docs):
+            if not self.add(doc):
+                return docs[i:]
+        return []
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _drain(self, limit):
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+    def _run(self):
+        while not self._closed:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            # Let a partial batch fill up for at most flush_interval
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        with self._write_lock:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.write_many(batch)
+                    return
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        print(f"Error inserting into MongoDB, dropped {len(batch)} buffered fact checks: {e}")
+                        return
+                    time.sleep(0.5 * 2 ** attempt)
+
+    def flush(self):
+        """Writes everything queued so far in the calling thread."""
+        while True:
+            batch = self._drain(self.max_batch_size)
+            if not batch:
+                break
+            self._write(batch)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._worker is not None:
+            self._worker.join(self.flush_interval * 2 + 1)  # Let it finish the batch it holds
+        self.flush()
@@ -0,0 +1,5 @@
+# benchmarks - Microbenchmarks and end-to-end load scenarios for ClarifAI
+#
+# Individual studies live in bench_*.py. The reproducible suite, with JSON
+# output and baseline comparison, is run with:
+#   python -m benchmarks.run --output results.json --baseline benchmarks/baseline.json
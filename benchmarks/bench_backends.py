@@ -0,0 +1,101 @@
+# bench_backends.py - Accuracy parity, latency and memory of each inference backend
+#
+# Run from the repository root with a labelled CSV (label 1 = Fake, 0 = True):
+#   python -m benchmarks.bench_backends --data datasets/labelled_sample.csv
+# Exits with status 1 if a backend's accuracy falls more than
+# --max-accuracy-drop below the fp32 model.
+import argparse
+import csv
+import gc
+import io
+import sys
+import time
+
+import numpy as np
+import torch
+
+from app.model_registry import INFERENCE_BACKENDS, apply_backend, build_model, get_tokenizer, memory_usage_mb
+from app.inference import predict_fake_news_batch
+
+
+def load_labelled_sample(path, text_column, label_column, limit):
+    texts, labels = [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            texts.append(row[text_column])
+            labels.append(int(row[label_column]))
+            if limit and len(texts) >= limit:
+                break
+    return texts, np.array(labels)
+
+
+def serialized_size_mb(model):
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 1024 / 1024
+
+
+def run_backend(backend, texts, batch_size):
+    gc.collect()
+    rss_before, _ = memory_usage_mb()
+    model = apply_backend(build_model(), backend, get_tokenizer())
+    rss_after, _ = memory_usage_mb()
+
+    predict_fake_news_batch(texts[:batch_size], model=model)  # Warm-up
+    predictions, latencies = [], []
+    for i in range(0, len(texts), batch_size):
+        start = time.perf_counter()
+        predictions.extend(predict_fake_news_batch(texts[i:i + batch_size], model=model))
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "predictions": np.array(predictions),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "rss_delta_mb": rss_after - rss_before,
+        "size_mb": serialized_size_mb(model),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--data", required=True, help="CSV file with text and label columns")
+    parser.add_argument("--text-column", default="text")
+    parser.add_argument("--label-column", default="label")
+    parser.add_argument("--limit", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--backends", nargs="+", default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01)
+    args = parser.parse_args()
+
+    texts, labels = load_labelled_sample(args.data, args.text_column, args.label_column, args.limit)
+    get_tokenizer()  # Load the registry up front so it does not count towards the first backend
+    print(f"{len(texts)} labelled texts, batch size {args.batch_size}, {torch.get_num_threads()} torch threads")
+
+    backends = ["fp32"] + [b for b in args.backends if b != "fp32"]
+    reference = None
+    failed = []
+    print(f"{'backend':<12} {'accuracy':>8} {'agree':>7} {'p50 ms':>8} {'p99 ms':>8} {'size MB':>8} {'RSS +MB':>8}")
+    for backend in backends:
+        r = run_backend(backend, texts, args.batch_size)
+        accuracy = float((r["predictions"] == labels).mean())
+        if reference is None:
+            reference = r
+            reference_accuracy = accuracy
+        agreement = float((r["predictions"] == reference["predictions"]).mean())
+        print(f"{backend:<12} {accuracy:8.3f} {agreement:7.3f} {r['p50_ms']:8.1f} {r['p99_ms']:8.1f} "
+              f"{r['size_mb']:8.1f} {r['rss_delta_mb']:8.1f}")
+        if reference_accuracy - accuracy > args.max_accuracy_drop:
+            failed.append(backend)
+
+    if failed:
+        print(f"Accuracy parity check FAILED for: {', '.join(failed)}")
+        sys.exit(1)
+    print("Accuracy parity check passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_batching.py - Per-request vs micro-batched inference under concurrent load
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_batching --requests 512 --concurrency 32
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from app.batching import BatchInferenceEngine
+from app.inference import predict_fake_news, predict_fake_news_batch
+from benchmarks.samples import SAMPLE_POSTS
+
+
+def run_load(predict, n_requests, concurrency):
+    texts = [SAMPLE_POSTS[i % len(SAMPLE_POSTS)] for i in range(n_requests)]
+    latencies = []
+
+    def timed(text):
+        start = time.perf_counter()
+        predict(text)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, texts))
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        "throughput_rps": n_requests / elapsed,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=512)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    predict_fake_news(SAMPLE_POSTS[0])  # Warm-up
+
+    engine = BatchInferenceEngine(predict_fake_news_batch, args.batch_size, args.max_wait_ms)
+    scenarios = {
+        "per-request": predict_fake_news,
+        f"batched (size={args.batch_size}, wait={args.max_wait_ms}ms)": engine.predict,
+    }
+    print(f"{args.requests} requests, concurrency {args.concurrency}")
+    for name, predict in scenarios.items():
+        r = run_load(predict, args.requests, args.concurrency)
+        print(f"{name:<40} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# bench_claim_rules.py - Precompiled claim rules vs the original keyword scans
+#
+# Run from the repository root, ideally on saved Fact Check API results
+# (JSONL with "text" and "textualRating" fields, one review per line):
+#   python -m benchmarks.bench_claim_rules --input datasets/fact_checks.jsonl
+# Without --input a synthetic sample built from the keyword lists is used.
+import argparse
+import json
+import random
+import time
+
+from claim_rules import assign_severities_deduped, assign_severity, classify_verdict, classify_verdicts_deduped
+
+
+# --- The per-call implementations previously in app.py, for reference ---
+def legacy_classify_verdict(verdict_text):
+    verdict_text = verdict_text.lower()
+    if any(x in verdict_text for x in ["false", "misleading", "incorrect", "untrue", "fake", "inaccurate", "not true"]):
+        return "❌ False"
+    elif any(x in verdict_text for x in ["true", "accurate", "correct", "mostly true"]):
+        return "✅ True"
+    else:
+        return "⚠️ Unclear"
+
+
+def legacy_assign_severity(claim):
+    claim = claim.lower()
+    keywords = {
+        10: ["vaccine", "covid-19", "health", "medical"],
+        9: ["explosion", "hazard", "attack", "war"],
+        8: ["climate change", "pollution", "disaster"],
+        7: ["election", "fraud", "corruption", "government"],
+        6: ["technology", "robot", "science", "AI", "radar"],
+        5: ["celebrity", "sports", "entertainment"],
+    }
+    for score, words in keywords.items():
+        if any(word in claim for word in words):
+            return score
+    return 4
+
+
+RATINGS = ["False", "Mostly False", "Misleading", "True", "Mostly True", "Half True", "Pants on Fire",
+           "Incorrect", "Not true", "Accurate", "Unproven", "Missing context", "Altered photo", "Satire"]
+FILLER = ("a video claims that the new policy will cost families thousands as officials said the "
+          "report shows people were told by experts in the city last week about plans").split()
+TOPICS = ["vaccine", "COVID-19", "war", "climate change", "election fraud", "AI", "robot", "celebrity",
+          "sports", "government", "disaster", "explosion", "medical", "radar"]
+
+
+def synthetic_sample(n, seed=0):
+    rng = random.Random(seed)
+    sample = []
+    for _ in range(n):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(8, 30))]
+        if rng.random() < 0.7:
+            words.insert(rng.randrange(len(words)), rng.choice(TOPICS))
+        sample.append({"text": " ".join(words), "textualRating": rng.choice(RATINGS)})
+    return sample
+
+
+def load_sample(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def timed(fn, items, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(items)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e6 / len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", help="JSONL of fact-check reviews with text and textualRating")
+    parser.add_argument("--size", type=int, default=100000, help="Synthetic sample size without --input")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sample = load_sample(args.input) if args.input else synthetic_sample(args.size)
+    texts = [r.get("text", "") for r in sample]
+    ratings = [r.get("textualRating", "") for r in sample]
+    print(f"{len(sample)} reviews ({'from ' + args.input if args.input else 'synthetic'}); best of {args.repeat}, us per item")
+
+    rows = [
+        ("verdict, legacy", lambda xs: [legacy_classify_verdict(x) for x in xs], ratings),
+        ("verdict, compiled", lambda xs: [classify_verdict(x) for x in xs], ratings),
+        ("verdict, deduped", classify_verdicts_deduped, ratings),
+        ("severity, legacy", lambda xs: [legacy_assign_severity(x) for x in xs], texts),
+        ("severity, compiled", lambda xs: [assign_severity(x) for x in xs], texts),
+        ("severity, deduped", assign_severities_deduped, texts),
+    ]
+    for name, fn, items in rows:
+        print(f"{name:<20} {timed(fn, items, args.repeat):8.2f}")
+
+    verdict_diff = sum(legacy_classify_verdict(r) != classify_verdict(r) for r in ratings)
+    severity_diff = sum(legacy_assign_severity(t) != assign_severity(t) for t in texts)
+    print(f"Differences from legacy: {verdict_diff} verdicts, {severity_diff} severities "
+          f"(severity differences come from the fixed \"AI\" keyword)")
+
+
+if __name__ == "__main__":
+    main()
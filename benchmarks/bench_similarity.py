@@ -0,0 +1,72 @@
+# bench_similarity.py - Recall and lookup latency of the near-duplicate claim index
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_similarity --claims 1000000 --queries 2000
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.similarity import SimilarClaimIndex
+
+VOCABULARY = (
+    "vaccine covid health doctors government election fraud climate flood fire war attack city "
+    "water cure cancer study scientists secret report police video shows president minister "
+    "banned tax schools children phones towers virus masks border army protest company billion "
+    "free money crypto prices fuel food shortage storm earthquake nasa moon aliens bill law"
+).split()
+REWORDINGS = [
+    lambda t, r: f"RT @user{r.randint(1, 999)}: {t}",
+    lambda t, r: f"{t} 😱😱",
+    lambda t, r: f"{t} #{r.choice(VOCABULARY)}",
+    lambda t, r: f"{t} https://t.co/{r.randint(10**6, 10**7)}",
+    lambda t, r: t.upper() + "!!!",
+]
+
+
+def random_claim(rng):
+    return " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(8, 20))) + f" {rng.randint(0, 10**6)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--claims", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    parser.add_argument("--max-claims", type=int, default=None, help="Index cap (default: --claims)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    index = SimilarClaimIndex(threshold=args.threshold, max_claims=args.max_claims or args.claims)
+    claims = [random_claim(rng) for _ in range(args.claims)]
+    start = time.perf_counter()
+    for claim in claims:
+        index.add(claim, "Fake")
+    print(f"Indexed {len(index)} claims in {time.perf_counter() - start:.1f}s")
+
+    def timed_lookups(queries):
+        found, latencies = [], []
+        for query in queries:
+            t = time.perf_counter()
+            found.append(index.lookup(query))
+            latencies.append((time.perf_counter() - t) * 1000)
+        return found, np.array(latencies)
+
+    # Reworded copies of stored claims should match their original
+    originals = rng.sample(claims, min(args.queries, len(claims)))
+    reworded = [rng.choice(REWORDINGS)(claim, rng) for claim in originals]
+    found, latencies = timed_lookups(reworded)
+    recall = np.mean([match is not None and match[0] == claim for match, claim in zip(found, originals)])
+
+    # Unrelated claims should not match anything
+    found_unrelated, unrelated_latencies = timed_lookups([random_claim(rng) for _ in range(args.queries)])
+    false_positives = np.mean([match is not None for match in found_unrelated])
+
+    all_latencies = np.concatenate([latencies, unrelated_latencies])
+    print(f"recall {recall:.3f}   false positive rate {false_positives:.4f}")
+    print(f"lookup p50 {np.percentile(all_latencies, 50):.3f} ms   p99 {np.percentile(all_latencies, 99):.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
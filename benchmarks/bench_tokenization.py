@@ -0,0 +1,68 @@
+# bench_tokenization.py - Fixed vs length-aware padding across max sequence lengths
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_tokenization --lengths 15 32 64 128 256 512
+import argparse
+import random
+import time
+
+import numpy as np
+import torch
+
+from app.model_registry import get_model, get_tokenizer
+from app.inference import predict_fake_news_batch
+from app.tokenization import token_cache
+from benchmarks.samples import SAMPLE_POSTS
+
+
+def mixed_length_posts(n, long_fraction, seed=0):
+    """Mostly short posts with a share of long threads, as on social media."""
+    rng = random.Random(seed)
+    posts = []
+    for i in range(n):
+        repeats = rng.randint(8, 40) if rng.random() < long_fraction else 1
+        posts.append(" ".join(rng.choice(SAMPLE_POSTS) for _ in range(repeats)) + f" #{i}")
+    return posts
+
+
+def predict_fixed_padding(texts, max_length):
+    """The previous path: every text padded to max_length, no cache."""
+    tokens = get_tokenizer().batch_encode_plus(
+        texts, max_length=max_length, padding="max_length", truncation=True, return_tensors="pt"
+    )
+    with torch.no_grad():
+        preds = get_model()(tokens["input_ids"], attention_mask=tokens["attention_mask"])
+    return np.argmax(preds.numpy(), axis=1).tolist()
+
+
+def time_batches(predict, texts, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        predict(texts[i:i + batch_size])
+    return (time.perf_counter() - start) * 1000 / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lengths", type=int, nargs="+", default=[15, 32, 64, 128, 256, 512])
+    parser.add_argument("--posts", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--long-fraction", type=float, default=0.1)
+    args = parser.parse_args()
+
+    texts = mixed_length_posts(args.posts, args.long_fraction)
+    predict_fixed_padding(texts[:2], 15)  # Warm-up
+    print(f"{args.posts} posts ({args.long_fraction:.0%} long), batch size {args.batch_size}; ms per post")
+    print(f"{'max_length':>10} {'fixed':>9} {'bucketed':>9} {'cached':>9} {'agree':>7}")
+    for max_length in args.lengths:
+        token_cache.clear()
+        fixed = time_batches(lambda b: predict_fixed_padding(b, max_length), texts, args.batch_size)
+        bucketed = time_batches(lambda b: predict_fake_news_batch(b, max_length=max_length), texts, args.batch_size)
+        cached = time_batches(lambda b: predict_fake_news_batch(b, max_length=max_length), texts, args.batch_size)
+        agree = np.mean(np.array(predict_fixed_padding(texts, max_length)) ==
+                        np.array(predict_fake_news_batch(texts, max_length=max_length)))
+        print(f"{max_length:>10} {fixed:9.2f} {bucketed:9.2f} {cached:9.2f} {agree:7.3f}")
+
+
+if __name__ == "__main__":
+    main()
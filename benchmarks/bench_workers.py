@@ -0,0 +1,47 @@
+# bench_workers.py - Throughput scaling of the multi-process inference pool
+#
+# Run from the repository root:
+#   python -m benchmarks.bench_workers --workers 1 2 4 8 16 --threads-per-worker 2
+import argparse
+
+import torch
+
+from app.batching import BatchInferenceEngine
+from app.inference import predict_fake_news_batch
+from app.worker_pool import InferenceWorkerPool
+from benchmarks.bench_batching import run_load
+from benchmarks.samples import SAMPLE_POSTS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads-per-worker", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=1024)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests, concurrency {args.concurrency}, batch size {args.batch_size}")
+    engine = BatchInferenceEngine(predict_fake_news_batch, args.batch_size, args.max_wait_ms)
+    engine.predict(SAMPLE_POSTS[0])  # Warm-up
+    r = run_load(engine.predict, args.requests, args.concurrency)
+    baseline = r["throughput_rps"]
+    print(f"{'in-process':<24} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms"
+          f"   ({torch.get_num_threads()} torch threads)")
+
+    for workers in args.workers:
+        pool = InferenceWorkerPool(workers, args.threads_per_worker)
+        engine = BatchInferenceEngine(pool.predict_batch, args.batch_size, args.max_wait_ms, dispatchers=workers)
+        for text in SAMPLE_POSTS[:workers]:
+            engine.predict(text)  # Start the workers before timing
+        r = run_load(engine.predict, args.requests, args.concurrency)
+        name = f"{workers} workers x {args.threads_per_worker} threads"
+        print(f"{name:<24} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   p99 {r['p99_ms']:7.1f} ms"
+              f"   ({r['throughput_rps'] / baseline:.2f}x)")
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+# e2e_server.py - The Flask API on mongomock or a local mongod, for load scenarios
+#
+# Started by benchmarks.run for its end-to-end scenarios, or by hand:
+#   python -m benchmarks.e2e_server --port 5055 --mongo mongomock
+# With --mongo local the API writes to the misinformation_db of the mongod on
+# localhost:27017, so point it at a throwaway instance.
+import argparse
+import logging
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--mongo", choices=["mongomock", "local"], default="mongomock")
+    args = parser.parse_args()
+
+    if args.mongo == "mongomock":
+        try:
+            import mongomock
+        except ImportError:
+            raise SystemExit("The mongomock scenarios need mongomock: pip install mongomock (or use --mongo local)")
+        import pymongo
+        pymongo.MongoClient = mongomock.MongoClient  # Before app.models connects
+
+    from werkzeug.serving import make_server
+    from app.model_registry import preload
+    from run import app
+
+    preload()  # Load time is not part of any scenario
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No access log line per request
+    print(f"Benchmark API ({args.mongo}) on http://127.0.0.1:{args.port}", flush=True)
+    make_server("127.0.0.1", args.port, app, threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
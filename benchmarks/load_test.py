@@ -0,0 +1,116 @@
+# load_test.py - Concurrent-connection load test of the fact-check API
+#
+# Start the servers to compare, then run from the repository root, e.g.:
+#   python run.py                                   # Flask on :5000
+#   uvicorn app.asgi:app --port 8000                # asyncio on :8000
+#   python -m benchmarks.load_test --target flask=http://127.0.0.1:5000 \
+#       --target asgi=http://127.0.0.1:8000 --connections 1000 --requests 5000
+#
+# Uses only asyncio streams, so thousands of client connections are cheap.
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+from benchmarks.samples import SAMPLE_POSTS
+
+
+class Connection:
+    """One HTTP/1.1 client connection, reopened when the server closes it."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def post_json(self, path, payload):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode()
+        self.writer.write(
+            f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed by server")
+        version, status = status_line.split()[:2]
+        headers = {}
+        while (line := await self.reader.readline()) not in (b"\r\n", b""):
+            name, _, value = line.decode().partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            await self.reader.read()  # Body delimited by connection close
+            self.close()
+        if version == b"HTTP/1.0" or headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def run_target(url, connections, total_requests, unique):
+    parts = urlsplit(url)
+    path = "/api/fact-check"
+    latencies, statuses, errors = [], {}, 0
+    counter = iter(range(total_requests))
+
+    async def client():
+        nonlocal errors
+        conn = Connection(parts.hostname, parts.port or 80)
+        for i in counter:
+            text = random.choice(SAMPLE_POSTS)
+            content = f"{text} #{i}" if unique else text
+            start = time.perf_counter()
+            try:
+                status = await conn.post_json(path, {"content": content})
+                statuses[status] = statuses.get(status, 0) + 1
+                latencies.append(time.perf_counter() - start)
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                errors += 1
+                conn.close()
+        conn.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000 if latencies else np.array([0.0])
+    return {
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(lat_ms, 50)),
+        "p99_ms": float(np.percentile(lat_ms, 99)),
+        "statuses": statuses,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--target", action="append", required=True, help="name=base_url, may be repeated")
+    parser.add_argument("--connections", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--unique", action="store_true", help="Send unique contents so every request misses the cache")
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests over {args.connections} connections"
+          f" ({'cache misses' if args.unique else 'repeated contents'})")
+    for target in args.target:
+        name, _, url = target.partition("=")
+        r = asyncio.run(run_target(url, args.connections, args.requests, args.unique))
+        print(f"{name:<10} {r['throughput_rps']:8.1f} req/s   p50 {r['p50_ms']:8.1f} ms   p99 {r['p99_ms']:8.1f} ms"
+              f"   statuses {r['statuses']}   errors {r['errors']}")
+
+
+if __name__ == "__main__":
+    main()
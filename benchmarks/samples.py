@@ -0,0 +1,12 @@
+# samples.py - Sample social media posts shared by the benchmarks
+
+SAMPLE_POSTS = [
+    "The Earth is flat",
+    "COVID-19 vaccines contain microchips that track your location",
+    "The government announced new election security measures today",
+    "Drinking hot water cures the flu",
+    "Scientists confirm climate change is accelerating faster than expected",
+    "A celebrity was arrested for fraud last night",
+    "5G towers are spreading the virus",
+    "The stock market closed higher after the central bank decision",
+]
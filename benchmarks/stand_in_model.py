@@ -0,0 +1,54 @@
+# stand_in_model.py - A small, randomly initialised BERT_Arch for runs without the real model
+#
+# Writes a 2-layer BERT (hidden size 768, as BERT_Arch expects) with a
+# WordPiece vocabulary built from the sample posts, and BERT_Arch weights from
+# a fixed seed, so the benchmark suite (and the tests) can run offline and
+# without the fine-tuned checkpoint. Predictions are meaningless; timings are
+# only comparable with other runs on the same stand-in.
+#   python -m benchmarks.stand_in_model /tmp/clarifai-stand-in
+#   export BERT_MODEL_NAME=/tmp/clarifai-stand-in MODEL_WEIGHTS_PATH=/tmp/clarifai-stand-in/weights.pt
+import argparse
+import os
+import re
+import string
+
+from benchmarks.samples import SAMPLE_POSTS
+
+SPECIAL_TOKENS = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+
+
+def write_stand_in_model(path, num_layers=2, seed=0):
+    """Writes the tokenizer, config and weights.pt to `path`; returns the weights path."""
+    import torch
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    from app.model_registry import BERT_Arch
+
+    os.makedirs(path, exist_ok=True)
+    words = sorted({w for post in SAMPLE_POSTS for w in re.findall(r"\w+|[^\w\s]", post.lower())})
+    characters = sorted({c for w in words for c in w} | set(string.ascii_lowercase + string.digits + "#"))
+    vocab = SPECIAL_TOKENS + words + characters + [f"##{c}" for c in characters]
+    with open(os.path.join(path, "vocab.txt"), "w", encoding="utf-8") as f:
+        f.write("\n".join(dict.fromkeys(vocab)) + "\n")
+    BertTokenizerFast(vocab_file=os.path.join(path, "vocab.txt")).save_pretrained(path)
+
+    config = BertConfig(vocab_size=len(dict.fromkeys(vocab)), hidden_size=768, num_hidden_layers=num_layers,
+                        num_attention_heads=12, intermediate_size=3072)
+    config.save_pretrained(path)
+    torch.manual_seed(seed)
+    weights = os.path.join(path, "weights.pt")
+    torch.save(BERT_Arch(BertModel(config)).state_dict(), weights)
+    return weights
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path")
+    parser.add_argument("--layers", type=int, default=2)
+    args = parser.parse_args()
+    weights = write_stand_in_model(args.path, args.layers)
+    print(f"export BERT_MODEL_NAME={os.path.abspath(args.path)} MODEL_WEIGHTS_PATH={os.path.abspath(weights)}")
+
+
+if __name__ == "__main__":
+    main()
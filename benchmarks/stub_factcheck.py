@@ -0,0 +1,80 @@
+# stub_factcheck.py - Local stand-in for the Google Fact Check Tools API
+#
+# Serves claims:search with deterministic claims, paged by pageSize and
+# offset/pageToken like the real API, after an optional fixed latency.
+#   python -m benchmarks.stub_factcheck --port 8089 --latency-ms 50
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+RATINGS = ["False", "Mostly False", "Misleading", "True", "Mostly True", "Half True", "Missing context"]
+PUBLISHERS = ["PolitiFact", "Snopes", "AFP Fact Check", "Reuters", "FactCheck.org"]
+
+
+def make_claims(query, start, stop):
+    return [{
+        "text": f"{query} (claim {i})",
+        "claimant": "Social media users",
+        "claimReview": [{
+            "publisher": {"name": PUBLISHERS[(i + j) % len(PUBLISHERS)]},
+            "url": f"https://example.org/fact-check/{i}-{j}",
+            "textualRating": RATINGS[(i + j) % len(RATINGS)],
+        } for j in range(1 + i % 3)],
+    } for i in range(start, stop)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API, so clients can reuse connections
+    total_claims = 100
+    latency = 0.0
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("query", [""])[0]
+        size = int(params.get("pageSize", ["10"])[0])
+        offset = int(params.get("offset", params.get("pageToken", ["0"]))[0] or 0)
+        stop = min(self.total_claims, offset + size)
+        body = {"claims": make_claims(query, offset, stop)}
+        if stop < self.total_claims:
+            body["nextPageToken"] = str(stop)
+        payload = json.dumps(body).encode("utf-8")
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(port=0, total_claims=100, latency_ms=0):
+    """Starts the stub in a background thread. Returns (server, base_url)."""
+    handler = type("Handler", (StubHandler,), {"total_claims": total_claims, "latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, name="stub-factcheck", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1alpha1/claims:search"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--claims", type=int, default=100, help="Claims available per query")
+    parser.add_argument("--latency-ms", type=float, default=0)
+    args = parser.parse_args()
+    handler = type("Handler", (StubHandler,), {"total_claims": args.claims, "latency": args.latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Stub Fact Check API on http://127.0.0.1:{args.port}/v1alpha1/claims:search")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
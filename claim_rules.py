@@ -0,0 +1,88 @@
+# claim_rules.py - Precompiled keyword rules for verdict labels and severity scores
+#
+# Keyword tiers live in claim_rules.json (or the file named by CLAIM_RULES_PATH)
+# and are compiled once at import into lowercased keyword tuples, so each call
+# only lowercases the text and runs plain substring checks. "keywords" match
+# anywhere in the text, like the original `word in text` checks; "whole_words"
+# only match as separate words (one regex per tier), for short keywords such as
+# "ai" that would otherwise hit "said" or "again".
+import json
+import os
+import re
+
+CLAIM_RULES_PATH = os.getenv("CLAIM_RULES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "claim_rules.json"))
+
+
+def compile_tier(tier):
+    keywords = tuple(sorted({k.lower() for k in tier.get("keywords", [])}))
+    whole_words = sorted({w.lower() for w in tier.get("whole_words", [])}, key=len, reverse=True)
+    pattern = re.compile(r"\b(?:" + "|".join(re.escape(w) for w in whole_words) + r")\b") if whole_words else None
+    return keywords, pattern
+
+
+def load_rules(path=CLAIM_RULES_PATH):
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    return {
+        "verdict": [(compile_tier(t), t["label"]) for t in rules["verdict"]],
+        "verdict_fallback": rules["verdict_fallback"],
+        "severity": [(compile_tier(t), t["score"]) for t in sorted(rules["severity"], key=lambda t: -t["score"])],
+        "severity_fallback": rules["severity_fallback"],
+    }
+
+
+RULES = load_rules()
+
+
+def classify_verdict(verdict_text):
+    verdict_text = verdict_text.lower()
+    for (keywords, pattern), label in RULES["verdict"]:
+        for keyword in keywords:
+            if keyword in verdict_text:
+                return label
+        if pattern is not None and pattern.search(verdict_text):
+            return label
+    return RULES["verdict_fallback"]
+
+
+def assign_severity(claim):
+    claim = claim.lower()
+    for (keywords, pattern), score in RULES["severity"]:
+        for keyword in keywords:
+            if keyword in claim:
+                return score
+        if pattern is not None and pattern.search(claim):
+            return score
+    return RULES["severity_fallback"]
+
+
+def classify_verdicts_deduped(verdict_texts):
+    """classify_verdict for each rating in a list; each distinct text is matched once."""
+    labels = {text: classify_verdict(text) for text in set(verdict_texts)}
+    return [labels[text] for text in verdict_texts]
+
+
+def assign_severities_deduped(claims):
+    """assign_severity for each claim in a list; each distinct text is matched once."""
+    scores = {claim: assign_severity(claim) for claim in set(claims)}
+    return [scores[claim] for claim in claims]
+
+
+def review_results(claims):
+    """One result row per (claim, review) of a Fact Check API search, with verdict label and severity."""
+    pairs = [(claim, review) for claim in claims for review in claim.get("claimReview", [])]
+    # Each distinct rating and claim text is matched once, not once per review
+    labels = classify_verdicts_deduped([review.get('textualRating', '') for _, review in pairs])
+    severities = assign_severities_deduped([claim.get('text', '') for claim, _ in pairs])
+
+    results = []
+    for (claim, review), label, severity in zip(pairs, labels, severities):
+        results.append({
+            "claim": claim.get('text', 'N/A'),
+            "fact_checker": review.get('publisher', {}).get('name', 'N/A'),
+            "verdict": review.get('textualRating', 'N/A'),
+            "verdict_label": label,
+            "url": review.get('url', '#'),
+            "severity_score": severity
+        })
+    return results
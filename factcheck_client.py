@@ -0,0 +1,171 @@
+# factcheck_client.py - Pooled, cached client for the Google Fact Check Tools API
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.cache import LRUCache
+from app.metrics import FACTCHECK_API_ERRORS, FACTCHECK_API_SECONDS
+from app.ratelimit import LOAD_SHED, RequestRejected
+from app.singleflight import SingleFlight
+from app.trending import TrendingCounter
+
+FACTCHECK_API_URL = "https://factchecktools.googleapis.com/v1alpha1/claims:search"
+
+
+def normalize_query(query):
+    # "The Earth is flat " and "the earth  is flat" share one cache entry
+    return " ".join(query.casefold().split())
+
+
+class FactCheckAPIError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(f"API Error {status_code}: {message}" if status_code else f"API request failed: {message}")
+        self.status_code = status_code
+        self.message = message
+
+
+class FactCheckClient:
+    """
+    Searches fact-checked claims. One pooled requests.Session is reused for
+    every call, results are cached by normalized query, and result pages
+    after the first are fetched concurrently. Concurrent searches for the
+    same query share one fetch, and searches are counted so refresh_trending()
+    can re-fetch the most popular queries before their cache entry expires.
+    Searches that miss the cache can be admitted by a ratelimit.RateLimiter
+    (`limiter`) and shed while `max_inflight` fetches are already running
+    (0 = no limit); rejected searches raise FactCheckAPIError 429/503.
+    The cache defaults to an app.cache.LRUCache with a one hour TTL; any
+    object with the same get(key) / set(key, value) methods can be passed
+    instead, e.g. one backed by Redis.
+    """
+
+    def __init__(self, api_key, base_url=FACTCHECK_API_URL, cache=None, timeout=(3.05, 10),
+                 page_size=10, max_pages=1, max_workers=8, trending_window=600, limiter=None, max_inflight=0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.cache = cache if cache is not None else LRUCache(2048, ttl=3600)
+        self.timeout = timeout
+        self.page_size = page_size
+        self.max_pages = max(1, max_pages)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="factcheck")
+        self.flight = SingleFlight()
+        self.trending = TrendingCounter(trending_window)
+        self.limiter = limiter
+        self.max_inflight = max_inflight
+
+    def fetch_page(self, query, page_token=None, offset=None):
+        params = {"query": query, "key": self.api_key, "pageSize": self.page_size}
+        if page_token:
+            params["pageToken"] = page_token
+        elif offset:
+            params["offset"] = offset
+        try:
+            with FACTCHECK_API_SECONDS.time():
+                response = self.session.get(self.base_url, params=params, timeout=self.timeout)
+        except requests.RequestException as e:
+            FACTCHECK_API_ERRORS.inc()
+            raise FactCheckAPIError(None, str(e)) from e
+        if response.status_code != 200:
+            FACTCHECK_API_ERRORS.inc()
+            raise FactCheckAPIError(response.status_code, response.text)
+        return response.json()
+
+    def iter_pages(self, query):
+        """Follows nextPageToken one page at a time, up to max_pages."""
+        page_token = None
+        for _ in range(self.max_pages):
+            page = self.fetch_page(query, page_token=page_token)
+            yield page
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                break
+
+    def fetch_claims(self, query):
+        """
+        Fetches up to max_pages pages of claims, bypassing the cache. The first
+        page tells us whether more exist (nextPageToken); the remaining pages
+        are then requested in parallel by offset instead of walking the token
+        chain one round trip at a time.
+        """
+        first = self.fetch_page(query)
+        claims = list(first.get("claims", []))
+        if not first.get("nextPageToken") or self.max_pages == 1:
+            return claims
+
+        offsets = [page * self.page_size for page in range(1, self.max_pages)]
+        pages = self._executor.map(lambda offset: self.fetch_page(query, offset=offset), offsets)
+        for page in pages:
+            if not page.get("claims"):
+                break
+            claims.extend(page["claims"])
+            if not page.get("nextPageToken"):
+                break
+        return claims
+
+    def _fetch_and_cache(self, query, key):
+        claims = self.fetch_claims(query)
+        self.cache.set(key, claims)
+        return claims
+
+    def admit(self, key, user=None):
+        """Raises FactCheckAPIError (429/503) if a new fetch for `user` is not allowed now."""
+        if self.flight.running(key):
+            return  # Joins a fetch that is already paid for
+        try:
+            if self.max_inflight and self.flight.in_flight() >= self.max_inflight:
+                LOAD_SHED.inc()
+                raise RequestRejected(503, "Too many searches in progress", 1.0)
+            if self.limiter is not None:
+                self.limiter.check(user)
+        except RequestRejected as e:
+            raise FactCheckAPIError(e.status, f"{e.message}, retry in {e.retry_after_header()}s") from e
+
+    def search(self, query, user=None):
+        key = normalize_query(query)
+        self.trending.record(key, query)
+        claims = self.cache.get(key)
+        if claims is None:
+            self.admit(key, user)
+            claims = self.flight.do(key, lambda: self._fetch_and_cache(query, key))
+        return claims
+
+    def refresh_trending(self, top_n=50, refresh_ahead=300):
+        """
+        Re-fetches the top_n most searched recent queries whose cached result
+        is missing or expires within refresh_ahead seconds, so popular queries
+        keep hitting the cache. Returns how many were refreshed. Cache backends
+        without ttl_remaining() are not refreshed.
+        """
+        ttl_remaining = getattr(self.cache, "ttl_remaining", None)
+        if ttl_remaining is None:
+            return 0
+        refreshed = 0
+        for key, query, _ in self.trending.top(top_n):
+            remaining = ttl_remaining(key)
+            if remaining is not None and remaining > refresh_ahead:
+                continue
+            try:
+                self.admit(key)  # Refreshes count against the global limit too
+                self.flight.do(key, lambda: self._fetch_and_cache(query, key))
+                refreshed += 1
+            except FactCheckAPIError as e:
+                print(f"Could not refresh '{query}': {e}")
+                if e.status_code in (429, 503):
+                    break  # Out of quota or busy: leave the rest to live searches
+        return refreshed
+
+    def search_many(self, queries):
+        """Runs several searches concurrently. Returns {query: claims}."""
+        # Separate pool: searches submit their page fetches to self._executor
+        with ThreadPoolExecutor(max_workers=max(1, min(len(queries), 8))) as pool:
+            return dict(zip(queries, pool.map(self.search, queries)))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.session.close()
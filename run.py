@@ -1,16 +1,17 @@
 from flask import Flask
 from app.routes import api
-from pymongo import MongoClient
+from app.config import Config
+from app.model_registry import preload
 
 app = Flask(__name__)
-
-# MongoDB Configuration
-app.config["MONGO_URI"] = "mongodb://localhost:27017/misinformation_db"
-mongo = MongoClient(app.config["MONGO_URI"])
-db = mongo.get_database()
+app.config.from_object(Config)  # Mongo is reached through app.db (Config.MONGO_URI)
 
 # Register Routes
 app.register_blueprint(api)
 
+# Load the model before serving (see Config.MODEL_PRELOAD)
+if Config.MODEL_PRELOAD:
+    preload()
+
 if __name__ == "__main__":
     app.run(debug=True, port=5000)
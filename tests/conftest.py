@@ -0,0 +1,30 @@
+# conftest.py - Shared fixtures. Run from the repository root:  python -m pytest tests
+import os
+import sys
+
+import mongomock
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import db  # noqa: E402
+
+# mongomock 4.3 predates the `sort` option pymongo 4.11 passes for UpdateOne in
+# bulk_write; it is never set here, so it is dropped
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+
+
+def _add_update_without_sort(self, *args, sort=None, **kwargs):
+    return _add_update(self, *args, **kwargs)
+
+
+mongomock.collection.BulkOperationBuilder.add_update = _add_update_without_sort
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Routes app.db to an in-memory mongomock server; returns the fact_checks collection."""
+    monkeypatch.setattr(db, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(db, "_clients", {})
+    monkeypatch.setattr(db, "_indexed", set())
+    return db.fact_checks_collection()
@@ -0,0 +1,64 @@
+# test_factcheck_client.py - FactCheckClient against the local stub API (benchmarks/stub_factcheck.py)
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from benchmarks.stub_factcheck import start_stub_server
+from factcheck_client import FactCheckClient
+
+LATENCY_MS = 200
+
+
+@pytest.fixture
+def stub():
+    """The stub server, recording (client address, query parameters) of every request."""
+    server, url = start_stub_server(total_claims=45, latency_ms=LATENCY_MS)
+    server.requests = []
+    lock = threading.Lock()
+    handler = server.RequestHandlerClass
+
+    class RecordingHandler(handler):
+        def do_GET(self):
+            with lock:
+                server.requests.append((self.client_address, parse_qs(urlparse(self.path).query)))
+            super().do_GET()
+
+    server.RequestHandlerClass = RecordingHandler
+    server.url = url
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_cache_hit_skips_the_api(stub):
+    client = FactCheckClient("key", base_url=stub.url)
+    claims = client.search("The Earth is flat")
+    assert len(claims) == 10 and claims[0]["text"] == "The Earth is flat (claim 0)"
+    assert client.search("the earth  is FLAT ") == claims  # Same normalized query
+    assert len(stub.requests) == 1
+    assert client.cache.stats()["hits"] == 1
+    client.close()
+
+
+def test_later_pages_are_fetched_in_parallel(stub):
+    client = FactCheckClient("key", base_url=stub.url, max_pages=5)
+    start = time.perf_counter()
+    claims = client.fetch_claims("5g towers")
+    elapsed = time.perf_counter() - start
+    assert [c["text"] for c in claims] == [f"5g towers (claim {i})" for i in range(45)]
+    offsets = sorted(int(params.get("offset", ["0"])[0]) for _, params in stub.requests)
+    assert offsets == [0, 10, 20, 30, 40]
+    # The first page, then the other four at once: two round trips rather than five
+    assert elapsed < 3.5 * LATENCY_MS / 1000
+    client.close()
+
+
+def test_searches_reuse_pooled_connections(stub):
+    client = FactCheckClient("key", base_url=stub.url)
+    for i in range(5):
+        client.search(f"claim number {i}")
+    assert len(stub.requests) == 5
+    assert len({address for address, _ in stub.requests}) == 1  # One kept-alive connection
+    client.close()
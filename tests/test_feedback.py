@@ -0,0 +1,54 @@
+# test_feedback.py - Feedback collection, statistics and the embedded-array migration (mongomock)
+from datetime import datetime
+
+from app import feedback
+from app.db import users_collection
+
+
+def make_user(email, entries):
+    return users_collection().insert_one({"email": email, "feedback": entries}).inserted_id
+
+
+def test_add_feedback_updates_all_time_and_daily_stats(mongo):
+    feedback.add_feedback("a@example.com", 5, 4, "great")
+    feedback.add_feedback("b@example.com", 3, 2, "")
+    stats = feedback.feedback_stats()
+    assert stats["count"] == 2
+    assert stats["accuracy_avg"] == 4
+    assert stats["experience_distribution"]["2"] == 1
+    today = feedback.daily_feedback_stats(days=1)[0]
+    assert today["day"] == datetime.utcnow().strftime("%Y-%m-%d") and today["count"] == 2
+
+
+def test_migration_increments_stats_without_losing_live_feedback(mongo):
+    feedback.add_feedback("live@example.com", 1, 1, "before")
+    make_user("old@example.com", [{"accuracy": "5", "experience": "5", "comments": "x"},
+                                  {"accuracy": "4", "experience": "3", "comments": "y"}])
+    # Counted only in feedback_stats, as an increment racing the migration would be
+    feedback._increment_stats([{"created_at": datetime.utcnow(), "accuracy": 2, "experience": 2}])
+
+    assert feedback.migrate_embedded_feedback() == (1, 2)
+    stats = feedback.feedback_stats()
+    assert stats["count"] == 4
+    assert stats["accuracy_distribution"] == {"1": 1, "2": 1, "3": 0, "4": 1, "5": 1}
+    assert "feedback" not in users_collection().find_one({"email": "old@example.com"})
+
+
+def test_migration_rerun_does_not_count_twice(mongo):
+    user_id = make_user("old@example.com", [{"accuracy": 5, "experience": 5, "comments": ""}])
+    feedback.migrate_embedded_feedback()
+    # A copy made by an earlier run whose $unset did not happen
+    users_collection().update_one({"_id": user_id}, {"$set": {"feedback": [
+        {"accuracy": 5, "experience": 5, "comments": ""},
+        {"accuracy": 1, "experience": 1, "comments": "new"},
+    ]}})
+    assert feedback.migrate_embedded_feedback() == (1, 1)
+    assert feedback.feedback_stats()["count"] == 2
+    assert feedback.feedback_collection().count_documents({}) == 2
+
+
+def test_rebuild_stats_replaces_the_collection(mongo):
+    feedback.add_feedback("a@example.com", 4, 4, "")
+    feedback.stats_collection().update_one({"_id": feedback.ALL_TIME}, {"$inc": {"count": 10}})
+    assert feedback.rebuild_stats() == 2  # All-time and today
+    assert feedback.feedback_stats()["count"] == 1
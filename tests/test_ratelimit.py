@@ -0,0 +1,43 @@
+# test_ratelimit.py - Token buckets of RateLimiter with the in-process store
+import pytest
+
+from app.ratelimit import MemoryBucketStore, RateLimiter, RequestRejected
+
+
+def allowed(limiter, user, attempts):
+    count = 0
+    for _ in range(attempts):
+        try:
+            limiter.check(user)
+            count += 1
+        except RequestRejected:
+            pass
+    return count
+
+
+def test_user_bucket_allows_burst_then_rejects():
+    limiter = RateLimiter(MemoryBucketStore(), user_rate=0.001, user_burst=3)
+    assert allowed(limiter, "alice", 5) == 3
+    assert allowed(limiter, "bob", 5) == 3  # Buckets are per user
+    with pytest.raises(RequestRejected) as e:
+        limiter.check("alice")
+    assert e.value.status == 429 and e.value.retry_after > 0
+
+
+def test_global_rejection_does_not_cost_user_tokens():
+    limiter = RateLimiter(MemoryBucketStore(), user_rate=0.001, user_burst=5, global_rate=0.001, global_burst=2)
+    assert allowed(limiter, "alice", 4) == 2  # Limited by the global bucket
+    limiter.global_rate = 0
+    assert allowed(limiter, "alice", 10) == 3  # 5 - the 2 admitted requests
+
+
+def test_user_rejection_does_not_cost_global_tokens():
+    limiter = RateLimiter(MemoryBucketStore(), user_rate=0.001, user_burst=1, global_rate=0.001, global_burst=3)
+    assert allowed(limiter, "alice", 5) == 1
+    assert allowed(limiter, "bob", 5) == 1
+    assert allowed(limiter, "carol", 5) == 1  # The global bucket still had a token for carol
+
+
+def test_cost_is_capped_to_burst():
+    limiter = RateLimiter(MemoryBucketStore(), user_rate=1000, user_burst=10)
+    limiter.check("alice", cost=500)  # A full bucket admits a batch larger than the burst
@@ -0,0 +1,37 @@
+# test_similarity.py - SimilarClaimIndex load and refresh against mongomock
+from bson import Binary
+
+from app.similarity import SimilarClaimIndex
+
+CLAIM = "Drinking hot water every fifteen minutes kills the coronavirus in your throat"
+REWORDED = "RT @someone: drinking hot water every 15 minutes kills the coronavirus in your throat!!"
+
+
+def stored(index, content, verdict):
+    return {"content": content, "verdict": verdict, "minhash": Binary(index.signature(content).tobytes())}
+
+
+def test_refresh_adds_claims_saved_by_other_processes(mongo):
+    index = SimilarClaimIndex(threshold=0.5)
+    mongo.insert_one(stored(index, "The moon landing was filmed in a studio in Nevada", "Fake"))
+    index.load(mongo)
+    assert len(index) == 1 and index.lookup(REWORDED) is None
+
+    # Saved by another worker after this process loaded its index
+    mongo.insert_one(stored(index, CLAIM, "Fake"))
+    assert index.refresh(mongo) == 1
+    content, verdict, similarity = index.lookup(REWORDED)
+    assert (content, verdict) == (CLAIM, "Fake") and similarity >= 0.5
+
+    assert index.refresh(mongo) == 0  # Nothing new
+    assert len(index) == 2
+
+
+def test_refresh_skips_claims_this_process_added(mongo):
+    index = SimilarClaimIndex(threshold=0.5)
+    index.load(mongo)
+    doc = stored(index, CLAIM, "Fake")
+    index.add(doc["content"], doc["verdict"])  # Saved here, then written to Mongo
+    mongo.insert_one(doc)
+    assert index.refresh(mongo) == 0
+    assert len(index) == 1
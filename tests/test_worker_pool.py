@@ -0,0 +1,98 @@
+# test_worker_pool.py - InferenceWorkerPool with the stand-in BERT_Arch (benchmarks/stand_in_model.py)
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from app import model_registry, tokenization  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.worker_pool import InferenceWorkerPool, WorkerCrashedError  # noqa: E402
+from benchmarks.stand_in_model import write_stand_in_model  # noqa: E402
+
+
+@pytest.fixture
+def tiny_model(tmp_path, monkeypatch):
+    """A one-layer, randomly initialised BERT_Arch and its tokenizer in tmp_path."""
+    weights = write_stand_in_model(str(tmp_path), num_layers=1)
+    monkeypatch.setattr(Config, "BERT_MODEL_NAME", str(tmp_path))
+    monkeypatch.setattr(Config, "MODEL_WEIGHTS_PATH", weights)
+    monkeypatch.setattr(model_registry, "_tokenizer", None)
+    tokenization.token_cache.clear()
+    yield
+    model_registry._tokenizer = None
+    tokenization.token_cache.clear()
+
+
+def wait_until_ready(pool, workers, timeout=120):
+    # A spawned worker imports torch and transformers first, which can take a while
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with pool._slots:
+            if pool._ready >= set(workers) and all(pool._processes[i].is_alive() for i in workers):
+                return
+        time.sleep(0.05)
+    raise AssertionError(f"Workers {workers} not ready after {timeout}s")
+
+
+@pytest.fixture
+def pool(tiny_model):
+    pool = InferenceWorkerPool(2, 1, backend="fp32", timeout=10)
+    pool.start()
+    wait_until_ready(pool, [0, 1])
+    yield pool
+    pool.close()
+
+
+def test_pool_answers_after_a_worker_is_killed(pool):
+    labels = pool.predict_batch(["5g towers spread viruses", "the moon"])
+    assert len(labels) == 2 and set(labels) <= {0, 1}
+    probabilities = pool.predict_batch(["drinking bleach cures covid"], output="probabilities")
+    assert sum(probabilities[0]) == pytest.approx(1.0, abs=1e-5)
+
+    # Killed right after answering, with nothing assigned: the other worker
+    # keeps answering, and the supervisor restarts it on a new results pipe
+    for index in (0, 1):
+        pool._processes[index].kill()
+        pool._processes[index].join()
+        for _ in range(4):
+            assert len(pool.predict_batch(["the moon", "drinking bleach"])) == 2
+        wait_until_ready(pool, [0, 1])
+    for _ in range(4):
+        assert len(pool.predict_batch(["5g towers"])) == 1
+    assert pool.queue_depth() == 0
+
+
+def test_killed_mid_batch_fails_only_that_batch(pool):
+    for process in pool._processes:
+        os.kill(process.pid, signal.SIGSTOP)  # Hold every worker so the batch stays assigned
+
+    with ThreadPoolExecutor(1) as executor:
+        result = executor.submit(pool.predict_batch, ["5g towers"])
+        while not pool._assigned:
+            time.sleep(0.01)
+        (busy, _), = pool._assigned.values()
+        os.kill(pool._processes[busy].pid, signal.SIGKILL)
+        for index, process in enumerate(pool._processes):
+            if index != busy:
+                os.kill(process.pid, signal.SIGCONT)
+        with pytest.raises(WorkerCrashedError, match="crashed"):
+            result.result(timeout=20)
+
+    assert len(pool.predict_batch(["the moon", "5g towers"])) == 2
+
+
+def test_no_free_worker_raises_after_timeout(pool):
+    pool.timeout = 1
+    pool._closing = True  # Keep the supervisor from restarting the workers
+    for process in pool._processes:
+        process.kill()
+        process.join()
+    start = time.monotonic()
+    with pytest.raises(WorkerCrashedError, match="No inference worker"):
+        pool.predict_batch(["the moon"])
+    assert time.monotonic() - start < 5
@@ -0,0 +1,161 @@
+# test_write_behind.py - WriteBehindBuffer and the fact_checks writes behind it, against mongomock
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+import types
+
+import pytest
+
+from app import write_behind
+from app.db import insert_fact_checks
+from app.write_behind import WriteBehindBuffer
+
+
+def docs(n, prefix="claim"):
+    return [{"content": f"{prefix} {i}", "verdict": "Fake"} for i in range(n)]
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class RecordingWriter:
+    """write_many for a buffer: inserts into `collection` and records the batch sizes."""
+
+    def __init__(self, collection, failures=0):
+        self.collection = collection
+        self.failures = failures
+        self.calls = 0
+        self.batches = []
+
+    def __call__(self, batch):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("mongo unavailable")
+        self.batches.append(len(batch))
+        insert_fact_checks(batch)
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    # Retries without sleeping between attempts
+    monkeypatch.setattr(write_behind, "time", types.SimpleNamespace(sleep=lambda s: None, monotonic=time.monotonic))
+
+
+def test_flushes_when_batch_is_full(mongo):
+    writer = RecordingWriter(mongo)
+    buffer = WriteBehindBuffer(writer, max_batch_size=5, flush_interval=2)
+    for doc in docs(5):
+        assert buffer.add(doc)
+    # Well before flush_interval
+    assert wait_for(lambda: mongo.count_documents({}) == 5, timeout=1)
+    assert writer.batches == [5]
+    buffer.close()
+
+
+def test_flushes_partial_batch_after_interval(mongo):
+    writer = RecordingWriter(mongo)
+    buffer = WriteBehindBuffer(writer, max_batch_size=100, flush_interval=0.2)
+    start = time.monotonic()
+    buffer.add_many(docs(3))
+    assert wait_for(lambda: mongo.count_documents({}) == 3)
+    assert time.monotonic() - start >= 0.2
+    assert writer.batches == [3]
+    buffer.close()
+
+
+def test_close_writes_everything_queued(mongo):
+    buffer = WriteBehindBuffer(RecordingWriter(mongo), max_batch_size=10, flush_interval=0.1)
+    assert buffer.add_many(docs(25)) == []
+    buffer.close()
+    assert mongo.count_documents({}) == 25
+    assert buffer.pending() == 0
+    assert not buffer.add(docs(1, "late")[0])  # Closed: callers write directly
+
+
+def test_queued_documents_are_written_at_exit(tmp_path):
+    # No close() call: the atexit hook flushes
+    out = tmp_path / "written.txt"
+    script = textwrap.dedent(f"""
+        from app.write_behind import WriteBehindBuffer
+        def write_many(batch):
+            with open({str(out)!r}, "a") as f:
+                f.writelines(doc + "\\n" for doc in batch)
+        buffer = WriteBehindBuffer(write_many, max_batch_size=1000, flush_interval=0.5)
+        buffer.add_many([f"doc {{i}}" for i in range(50)])
+    """)
+    root = __file__.rsplit("/tests/", 1)[0]
+    subprocess.run([sys.executable, "-c", script], cwd=root, check=True, timeout=60)
+    assert out.read_text().splitlines() == [f"doc {i}" for i in range(50)]
+
+
+def test_insert_skips_duplicates_and_keeps_the_rest(mongo, capsys):
+    insert_fact_checks(docs(3))
+    insert_fact_checks([{"content": "claim 1", "verdict": "True"}] + docs(2, "new"))
+    assert mongo.count_documents({}) == 5
+    assert mongo.find_one({"content": "claim 1"})["verdict"] == "Fake"
+    assert "skipped 1 duplicates" in capsys.readouterr().out
+
+
+def test_failed_batch_is_retried(mongo, no_backoff):
+    writer = RecordingWriter(mongo, failures=2)
+    buffer = WriteBehindBuffer(writer, max_batch_size=100, flush_interval=0.05, max_retries=3)
+    buffer.add_many(docs(4))
+    assert wait_for(lambda: mongo.count_documents({}) == 4)
+    assert writer.calls == 3
+    buffer.close()
+
+
+def test_batch_is_dropped_after_max_retries(mongo, no_backoff, capsys):
+    writer = RecordingWriter(mongo, failures=4)
+    buffer = WriteBehindBuffer(writer, max_batch_size=100, flush_interval=0.05, max_retries=2)
+    buffer.add_many(docs(4))
+    assert wait_for(lambda: writer.calls == 3)
+    assert wait_for(lambda: "dropped 4 buffered fact checks" in capsys.readouterr().out)
+    # The buffer keeps working once Mongo is back
+    buffer.add(docs(1, "after")[0])
+    buffer.close()
+    assert [d["content"] for d in mongo.find()] == ["after 0"]
+
+
+@pytest.fixture
+def full_buffer(mongo):
+    """A buffer whose writer is stuck and whose queue is full."""
+    release = threading.Event()
+    writing = threading.Event()
+
+    def stuck_writer(batch):
+        writing.set()
+        release.wait(10)
+        insert_fact_checks(batch)
+
+    buffer = WriteBehindBuffer(stuck_writer, max_batch_size=1, flush_interval=0.05, max_pending=2, put_timeout=0.1)
+    buffer.add(docs(1, "first")[0])
+    assert writing.wait(5)  # The worker holds "first"; the queue is empty again
+    assert buffer.add_many(docs(2, "queued")) == []
+    yield buffer
+    release.set()
+    buffer.close()
+
+
+def test_add_returns_false_when_full(full_buffer):
+    start = time.monotonic()
+    assert not full_buffer.add(docs(1, "overflow")[0])
+    assert time.monotonic() - start >= 0.1  # Blocked for put_timeout first
+    assert full_buffer.add_many(docs(3, "more")) == docs(3, "more")
+
+
+def test_save_fact_check_writes_directly_when_buffer_is_full(mongo, full_buffer, monkeypatch):
+    from app import models
+    monkeypatch.setattr(models, "write_buffer", full_buffer)
+    models.save_fact_check("overflow claim", "Fake")
+    assert mongo.find_one({"content": "overflow claim"})["verdict"] == "Fake"
+    models.save_fact_checks([("overflow a", "True"), ("overflow b", "Fake")])
+    assert mongo.count_documents({"content": {"$in": ["overflow a", "overflow b"]}}) == 2
@@ -0,0 +1,148 @@
+# visualization.py - Word cloud, sentiment and severity summaries for the Streamlit UI
+#
+# Word clouds and sentiment are computed on a small thread pool, off the
+# Streamlit script thread, and cached by a hash of their input, so the same
+# set of claims is rendered once for every user. The cache holds futures:
+# concurrent sessions asking for the same picture wait on one render. When
+# VISUALS_BUSY_RENDERS renders are already queued, the word cloud is replaced
+# by its term-frequency list, which needs no layout or PNG encoding.
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from textblob import TextBlob
+from wordcloud import WordCloud
+
+from app.cache import LRUCache
+from app.metrics import Histogram
+
+VISUALS_CACHE_SIZE = int(os.getenv("VISUALS_CACHE_SIZE", 256))
+VISUALS_WORKERS = int(os.getenv("VISUALS_WORKERS", 2))
+VISUALS_BUSY_RENDERS = int(os.getenv("VISUALS_BUSY_RENDERS", 4))
+WORD_CLOUD_SIZE = (800, 400)
+TOP_TERMS = 20
+
+WORD_CLOUD_RENDER_SECONDS = Histogram("clarifai_word_cloud_render_seconds", "Time to lay out and encode a word cloud")
+SENTIMENT_SECONDS = Histogram("clarifai_sentiment_seconds", "Time to score the sentiment of a statement")
+
+_executor = ThreadPoolExecutor(max_workers=VISUALS_WORKERS, thread_name_prefix="visuals")
+_cache = LRUCache(VISUALS_CACHE_SIZE)
+_lock = threading.Lock()
+_pending = 0  # Renders queued or running
+
+
+def content_hash(*parts):
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def word_cloud_text(claims):
+    return " ".join([f"{c['claim']} {c['verdict']}" for c in claims])
+
+
+def term_frequencies(text):
+    """Word counts after WordCloud's own tokenizing and stopword removal (no layout)."""
+    return WordCloud().process_text(text)
+
+
+def render_word_cloud(frequencies, width, height):
+    with WORD_CLOUD_RENDER_SECONDS.time():
+        wordcloud = WordCloud(width=width, height=height, background_color="white")
+        wordcloud.generate_from_frequencies(frequencies)
+        img = io.BytesIO()
+        wordcloud.to_image().save(img, format='PNG')
+    return img.getvalue()
+
+
+def generate_word_cloud(claims):
+    text = word_cloud_text(claims)
+    if not text.strip():
+        return None
+    frequencies = term_frequencies(text)
+    if not frequencies:
+        return None
+    return io.BytesIO(render_word_cloud(frequencies, *WORD_CLOUD_SIZE))
+
+
+def analyze_sentiment(text):
+    with SENTIMENT_SECONDS.time():
+        score = TextBlob(text).sentiment.polarity
+    if score > 0.1:
+        return {"positive": 80, "neutral": 10, "negative": 10}
+    elif score < -0.1:
+        return {"positive": 10, "neutral": 20, "negative": 70}
+    else:
+        return {"positive": 20, "neutral": 60, "negative": 20}
+
+
+def calculate_average_severity(results):
+    if not results:
+        return 0
+    return sum(r['severity_score'] for r in results) / len(results)
+
+
+# --- Cached, off-thread versions for the UI ---
+def _cached(key, compute):
+    """Returns a Future for compute(), shared with every caller asking for the same key."""
+    global _pending
+    with _lock:
+        future = _cache.get(key)
+        if future is not None:
+            return future
+        future = Future()
+        _cache.set(key, future)
+        _pending += 1
+
+    def run():
+        global _pending
+        try:
+            future.set_result(compute())
+        except Exception as e:
+            _cache.set(key, None)  # Do not cache failures
+            future.set_exception(e)
+        finally:
+            with _lock:
+                _pending -= 1
+
+    _executor.submit(run)
+    return future
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def busy():
+    return _pending >= VISUALS_BUSY_RENDERS
+
+
+def word_cloud_async(claims):
+    """
+    Returns a Future resolving to ("image", png_bytes), ("terms", [(term,
+    count), ...]) under load, or None when there is nothing to show.
+    """
+    text = word_cloud_text(claims)
+    if not text.strip():
+        return _done(None)
+    key = content_hash("wordcloud", text)
+    future = _cache.get(key)
+    if future is not None:
+        return future
+    if busy():
+        # Cheap view, computed here and not cached, so the full cloud is still
+        # rendered for this claim set once load drops
+        terms = sorted(term_frequencies(text).items(), key=lambda t: -t[1])[:TOP_TERMS]
+        return _done(("terms", terms) if terms else None)
+
+    def compute():
+        frequencies = term_frequencies(text)
+        return ("image", render_word_cloud(frequencies, *WORD_CLOUD_SIZE)) if frequencies else None
+
+    return _cached(key, compute)
+
+
+def sentiment_async(text):
+    return _cached(content_hash("sentiment", text), lambda: analyze_sentiment(text))